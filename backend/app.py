@@ -1,10 +1,56 @@
-from fastapi import FastAPI, Query, Body, Response
+import os
+import uuid
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Body, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from audit.crawler import run_audit
-from audit.pdf_report import build_pdf
+from pydantic import BaseModel, Field
+from audit.crawler import run_audit, run_audit_iter
+from audit.pdf_report import PdfRenderer, iter_file
+from audit.pagestore import PageStore
+from audit.reportstore import ReportStore, PAGE_LIMIT, MAX_PAGE_LIMIT
+from audit.jobs import JobManager, JobQueueFull, DONE
+from audit.resultcache import AuditCache, audit_key
+from audit.keywords import MAX_KEYWORDS
+from audit.batch import BatchManager, BatchBusy, BATCH_NAME, batch_summary
+from audit import metrics
 
-app = FastAPI(title="SEO Quick Audit Tool")
+# Shared by every audit so re-audits only re-analyze changed pages. PAGE_CACHE_PATH="" disables it.
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "page_cache.sqlite3")
+page_store = PageStore(PAGE_CACHE_PATH) if PAGE_CACHE_PATH else None
+
+# Identical audits requested close together share one crawl
+audit_cache = AuditCache()
+
+# Finished job reports, paged through /api/reports. REPORT_STORE_PATH="" keeps them in memory instead.
+REPORT_STORE_PATH = os.getenv("REPORT_STORE_PATH", "reports.sqlite3")
+report_store = ReportStore(REPORT_STORE_PATH) if REPORT_STORE_PATH else None
+
+jobs = JobManager(page_store=page_store, result_cache=audit_cache, report_store=report_store)
+
+# Upper bound on max_pages. The synchronous endpoints hold a request thread and the whole report
+# for the length of the crawl, so they keep a small cap; large audits go through /api/jobs or /api/batch.
+MAX_PAGES_LIMIT = 100_000
+SYNC_MAX_PAGES_LIMIT = 200
+
+# Batch audits write their reports here, one JSONL file per batch name
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "batch_results")
+MAX_BATCH_SITES = 10_000
+batches = BatchManager(BATCH_OUTPUT_DIR, page_store=page_store)
+
+# Rendered PDFs, keyed by report content hash
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_cache")
+pdf_renderer = PdfRenderer(PDF_CACHE_DIR)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    jobs.shutdown()
+    batches.shutdown()
+    pdf_renderer.shutdown()
+
+app = FastAPI(title="SEO Quick Audit Tool", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,20 +59,203 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def json_response(data) -> Response:
+    # reports can run to tens of MB: encode them with orjson instead of FastAPI's jsonable_encoder
+    return Response(orjson.dumps(data), media_type="application/json")
+
 class PdfRequest(BaseModel):
     report: dict
 
+class AuditRequest(BaseModel):
+    url: str = Field(..., description="Homepage URL")
+    target_keyword: str | None = None
+    target_keywords: list[str] = Field(default_factory=list, max_length=MAX_KEYWORDS,
+                                       description="More keywords to count; target_keyword stays the primary one")
+    max_pages: int = Field(25, ge=1, le=MAX_PAGES_LIMIT)
+    max_depth: int = Field(2, ge=0, le=5)
+
+class BatchRequest(BaseModel):
+    sites: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_SITES, description="Homepage URLs")
+    name: str | None = Field(None, pattern=BATCH_NAME.pattern,
+                             description="Output name; reuse a finished or crashed batch's name to resume it")
+    target_keyword: str | None = None
+    target_keywords: list[str] = Field(default_factory=list, max_length=MAX_KEYWORDS)
+    max_pages: int = Field(25, ge=1, le=MAX_PAGES_LIMIT)
+    max_depth: int = Field(2, ge=0, le=5)
+
 @app.get("/api/audit")
 def api_audit(
     url: str = Query(..., description="Homepage URL"),
     target_keyword: str | None = Query(None),
-    max_pages: int = Query(25, ge=1, le=200),
+    target_keywords: list[str] = Query([], max_length=MAX_KEYWORDS, description="Repeat for each keyword"),
+    max_pages: int = Query(25, ge=1, le=SYNC_MAX_PAGES_LIMIT),
+    max_depth: int = Query(2, ge=0, le=5),
+):
+    key = audit_key(url, target_keyword, max_pages, max_depth, target_keywords)
+    report = audit_cache.get_or_run(key, lambda: run_audit(url=url, target_keyword=target_keyword, max_pages=max_pages,
+                                                           max_depth=max_depth, page_store=page_store,
+                                                           target_keywords=target_keywords))
+    return json_response(report)
+
+@app.get("/api/audit/cache")
+def api_audit_cache():
+    return audit_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+def _audit_events(events, fmt: str):
+    # "page" events carry one PageData (its issues included); the final "report" event carries
+    # the site-wide sections: duplicates, broken links, priority buckets
+    for kind, item in events:
+        if kind == "page":
+            item = item.to_dict()
+        if fmt == "sse":
+            yield b"event: " + kind.encode() + b"\ndata: " + orjson.dumps(item) + b"\n\n"
+        else:
+            yield orjson.dumps({"event": kind, "data": item}) + b"\n"
+
+@app.get("/api/audit/stream")
+def api_audit_stream(
+    url: str = Query(..., description="Homepage URL"),
+    target_keyword: str | None = Query(None),
+    target_keywords: list[str] = Query([], max_length=MAX_KEYWORDS, description="Repeat for each keyword"),
+    max_pages: int = Query(25, ge=1, le=SYNC_MAX_PAGES_LIMIT),
     max_depth: int = Query(2, ge=0, le=5),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+):
+    events = run_audit_iter(url=url, target_keyword=target_keyword, max_pages=max_pages, max_depth=max_depth,
+                            page_store=page_store, target_keywords=target_keywords)
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_audit_events(events, format), media_type=media_type)
+
+@app.post("/api/jobs", status_code=202)
+def api_job_submit(payload: AuditRequest = Body(...)):
+    try:
+        job = jobs.submit(payload.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many audits queued: {e}")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}")
+def api_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}/result")
+def api_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    if "report_id" in job.result:
+        # the whole report, streamed from the store's rows; /api/reports/{id}/... pages through it
+        _report_summary(job.result["report_id"])
+        return StreamingResponse(report_store.iter_json(job.result["report_id"]), media_type="application/json")
+    return json_response(job.result)
+
+@app.delete("/api/jobs/{job_id}")
+def api_job_cancel(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return job.summary()
+
+def _report_summary(report_id: str) -> dict:
+    summary = report_store.summary(report_id) if report_store else None
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired report.")
+    return summary
+
+@app.get("/api/reports/{report_id}")
+def api_report(report_id: str):
+    # site, inputs, discovery, timings and counts per priority / issue code; no pages or issues
+    return json_response(_report_summary(report_id))
+
+@app.get("/api/reports/{report_id}/pages")
+def api_report_pages(
+    report_id: str,
+    status: int | None = Query(None),
+    issue: str | None = Query(None, description="Only pages with this issue code, e.g. MISSING_H1"),
+    url: str | None = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
 ):
-    report = run_audit(url=url, target_keyword=target_keyword, max_pages=max_pages, max_depth=max_depth)
-    return report
+    _report_summary(report_id)
+    return json_response(report_store.pages(report_id, status, issue, url, offset, limit))
+
+@app.get("/api/reports/{report_id}/issues")
+def api_report_issues(
+    report_id: str,
+    priority: str | None = Query(None, pattern="^P[123]$"),
+    code: str | None = Query(None),
+    url: str | None = Query(None, description="Only issues reported on this page"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+):
+    _report_summary(report_id)
+    return json_response(report_store.issues(report_id, priority, code, url, offset, limit))
+
+@app.get("/api/reports/{report_id}/broken-links")
+def api_report_broken_links(
+    report_id: str,
+    source: str | None = Query(None, description="Only links found on this page"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+):
+    _report_summary(report_id)
+    return json_response(report_store.broken_links(report_id, source, offset, limit))
+
+@app.get("/api/reports/{report_id}/pdf")
+async def api_report_pdf(report_id: str):
+    _report_summary(report_id)
+    path = await pdf_renderer.render_stored(REPORT_STORE_PATH, report_id)
+    return StreamingResponse(iter_file(path), media_type="application/pdf")
+
+@app.post("/api/batch", status_code=202)
+def api_batch_submit(payload: BatchRequest = Body(...)):
+    params = payload.model_dump()
+    params["name"] = payload.name or uuid.uuid4().hex
+    try:
+        job = batches.submit(params)
+    except BatchBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many batches queued: {e}")
+    return batch_summary(job)
+
+@app.get("/api/batch/{job_id}")
+def api_batch_status(job_id: str):
+    job = batches.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch.")
+    return batch_summary(job)
+
+@app.get("/api/batch/{job_id}/results")
+def api_batch_results(job_id: str):
+    # JSONL, one finished site per line; readable while the batch runs (the last line may still be partial)
+    job = batches.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch.")
+    path = batches.output_path(job.params["name"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No results yet.")
+    return StreamingResponse(iter_file(path), media_type="application/x-ndjson")
+
+@app.delete("/api/batch/{job_id}")
+def api_batch_cancel(job_id: str):
+    job = batches.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch.")
+    return batch_summary(job)
 
 @app.post("/api/pdf")
-def api_pdf(payload: PdfRequest = Body(...)):
-    pdf_bytes = build_pdf(payload.report)
-    return Response(content=pdf_bytes, media_type="application/pdf")
\ No newline at end of file
+async def api_pdf(payload: PdfRequest = Body(...)):
+    # rendered in a worker process; the request only waits on it
+    path = await pdf_renderer.render(payload.report)
+    return StreamingResponse(iter_file(path), media_type="application/pdf")
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Batch audits: many sites under one scheduler, each finished report appended to a JSONL file.
+
+    cd backend
+    python -m audit.batch sites.txt -o results.jsonl --max-pages 25
+    python -m audit.batch sites.txt -o results.jsonl     # again after a crash: resumes
+
+sites.txt holds one URL per line; blank lines and # comments are skipped.
+
+Every crawl in the batch shares one Transport, so --concurrency caps requests in flight across
+all sites together and the per-host limit holds even when sites share a host. Each site queues for
+the global slots with at most its per-host share of requests, in arrival order, so small sites
+interleave with large ones instead of waiting behind them.
+
+Output lines are {"site", "status", "error", "elapsed_s", "report"} in completion order, each
+fsynced as it is written. Rerunning with the same output file skips the sites already in it.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import orjson
+from collections import deque
+from collections.abc import Callable, Iterable
+
+from .crawler import PARSE_WORKERS, iter_audit
+from .jobs import DONE, FAILED, Job, JobManager
+from .pagestore import PageStore
+from .transport import PER_HOST_CONCURRENCY, Transport
+from .utils import canonicalize_url
+
+BATCH_CONCURRENCY = 64        # requests in flight across every site of a batch
+BATCH_SITES = 16              # sites crawled at once
+MAX_CONCURRENT_BATCHES = 1    # batches the API runs at once; later ones queue
+MAX_QUEUED_BATCHES = 10
+BATCH_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")  # output file name, safe to join onto a directory
+
+INVALID = "invalid"  # a record's status is DONE, INVALID (bad or blocked URL) or FAILED (the crawl raised)
+
+class BatchBusy(Exception):
+    pass
+
+def read_sites(lines: Iterable[str]) -> list[str]:
+    """Returns: the URLs of a sites file, in order, without blanks, # comments or repeats."""
+    seen: set[str] = set()
+    sites = []
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        key = canonicalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            sites.append(url)
+    return sites
+
+class ResultLog:
+    """
+    A batch's JSONL output, append-only. Opening it drops a torn last line left by a crash and
+    collects the sites already recorded; each write is flushed and fsynced before it counts.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded: set[str] = set()  # canonical site URLs
+        self._lock = threading.Lock()
+        intact = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        site = orjson.loads(line)["site"]
+                    except (orjson.JSONDecodeError, KeyError, TypeError):
+                        break
+                    self.recorded.add(canonicalize_url(site))
+                    intact += len(line)
+        self._f = open(path, "ab")
+        self._f.truncate(intact)
+
+    def write(self, record: dict) -> None:
+        line = orjson.dumps(record) + b"\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self.recorded.add(canonicalize_url(record["site"]))
+
+    def close(self) -> None:
+        with self._lock:  # waits for a write still running in its thread
+            self._f.close()
+
+async def run_batch(sites: Iterable[str], out_path: str, target_keyword: str | None = None, max_pages: int = 25,
+                    max_depth: int = 2, target_keywords: list[str] | None = None,
+                    concurrency: int = BATCH_CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                    max_sites: int = BATCH_SITES, parse_workers: int = PARSE_WORKERS,
+                    page_store: PageStore | None = None,
+                    on_site: Callable[[dict, dict], None] | None = None) -> dict:
+    """
+    Audits every site not yet recorded in out_path, max_sites at a time, and appends each
+    report as soon as its crawl finishes. on_site(record, counts) runs after every write.
+    Returns: counts {"total", "skipped", "done", "invalid", "failed"}.
+    """
+    sites = read_sites(sites)
+    log = ResultLog(out_path)
+    todo = deque(s for s in sites if canonicalize_url(s) not in log.recorded)
+    counts = {"total": len(sites), "skipped": len(sites) - len(todo), DONE: 0, INVALID: 0, FAILED: 0}
+    write_lock = asyncio.Lock()  # keeps lines in completion order
+
+    async def audit(site: str, transport: Transport) -> dict:
+        started = time.perf_counter()
+        report, error = {}, None
+        try:
+            # per site, only as many fetchers as the host may serve at once
+            async for kind, item in iter_audit(site, target_keyword, max_pages, max_depth, per_host_concurrency,
+                                               per_host_concurrency, parse_workers, page_store,
+                                               target_keywords=target_keywords, transport=transport):
+                if kind == "report":
+                    report = item
+        except Exception as e:  # one broken site must not end the batch
+            error = str(e) or type(e).__name__
+        status = FAILED if error else INVALID if "error" in report else DONE
+        return {"site": site, "status": status, "error": error or report.get("error"),
+                "elapsed_s": round(time.perf_counter() - started, 3), "report": report if status == DONE else None}
+
+    async def worker(transport: Transport):
+        while todo:
+            record = await audit(todo.popleft(), transport)
+            async with write_lock:
+                await asyncio.to_thread(log.write, record)  # large reports: encode and fsync off the loop
+            counts[record["status"]] += 1
+            if on_site:
+                on_site(record, counts)
+
+    try:
+        async with Transport(concurrency, per_host_concurrency) as transport:
+            workers = [asyncio.create_task(worker(transport)) for _ in range(min(max_sites, len(todo)))]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for t in workers:
+                    t.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+    finally:
+        log.close()
+    return counts
+
+def batch_summary(job: Job) -> dict:
+    """Job.summary() for a batch: the site list is replaced by its length, counts are under "progress"."""
+    d = job.summary()
+    d["params"] = {k: v for k, v in job.params.items() if k != "sites"}
+    d["sites"] = len(job.params["sites"])
+    d["progress"] = job.result
+    return d
+
+class BatchManager(JobManager):
+    """
+    Runs batches as background jobs. params are run_batch's keyword arguments (sites,
+    target_keyword, ...) plus "name": the output is output_dir/<name>.jsonl, and submitting a
+    finished or crashed batch's name again resumes it. job.result holds the running counts and
+    pages_done the pages crawled across all sites.
+    """
+    def __init__(self, output_dir: str, max_concurrent: int = MAX_CONCURRENT_BATCHES,
+                 max_queued: int = MAX_QUEUED_BATCHES, page_store: PageStore | None = None):
+        super().__init__(max_concurrent=max_concurrent, max_queued=max_queued, page_store=page_store)
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self._active_names: set[str] = set()  # one writer per output file
+
+    def output_path(self, name: str) -> str:
+        if not BATCH_NAME.match(name):
+            raise ValueError(f"Invalid batch name: {name!r}")
+        return os.path.join(self.output_dir, f"{name}.jsonl")
+
+    def submit(self, params: dict) -> Job:
+        name = params["name"]
+        self.output_path(name)
+        with self._lock:
+            if name in self._active_names:
+                raise BatchBusy(f"batch {name!r} is already queued or running")
+            self._active_names.add(name)
+        try:
+            return super().submit(params)
+        except BaseException:
+            with self._lock:
+                self._active_names.discard(name)
+            raise
+
+    async def _execute(self, job: Job) -> dict:
+        params = dict(job.params)
+        out_path = self.output_path(params.pop("name"))
+
+        def on_site(record: dict, counts: dict) -> None:
+            if record["report"]:
+                job.pages_done += record["report"]["site"]["pages_crawled"]
+            job.result = dict(counts)
+            self.store.save(job)
+        return await run_batch(out_path=out_path, page_store=self.page_store, on_site=on_site, **params)
+
+    def _finish(self, job: Job, status: str) -> None:
+        super()._finish(job, status)
+        with self._lock:
+            self._active_names.discard(job.params["name"])
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sites", help="file with one URL per line, - for stdin")
+    ap.add_argument("-o", "--output", required=True, help="JSONL file to append to; reusing it resumes the batch")
+    ap.add_argument("--keyword", help="primary target keyword")
+    ap.add_argument("--keywords-file", help="more target keywords, one per line")
+    ap.add_argument("--max-pages", type=int, default=25)
+    ap.add_argument("--max-depth", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="requests in flight across all sites")
+    ap.add_argument("--per-host", type=int, default=PER_HOST_CONCURRENCY, help="requests in flight per host")
+    ap.add_argument("--sites-at-once", type=int, default=BATCH_SITES)
+    ap.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    ap.add_argument("--page-cache", help="PageStore file, so re-runs only re-analyze changed pages")
+    args = ap.parse_args(argv)
+
+    if args.sites == "-":
+        sites = read_sites(sys.stdin)
+    else:
+        with open(args.sites, encoding="utf-8") as f:
+            sites = read_sites(f)
+    keywords = None
+    if args.keywords_file:
+        with open(args.keywords_file, encoding="utf-8") as f:
+            keywords = [line.strip() for line in f if line.strip()]
+    page_store = PageStore(args.page_cache) if args.page_cache else None
+
+    def progress(record: dict, counts: dict) -> None:
+        finished = counts[DONE] + counts[INVALID] + counts[FAILED]
+        print(f"[{finished}/{counts['total'] - counts['skipped']}] {record['status']:<7} {record['site']}"
+              f"  {record['error'] or ''}", file=sys.stderr)
+
+    try:
+        counts = asyncio.run(run_batch(sites, args.output, args.keyword, args.max_pages, args.max_depth, keywords,
+                                       args.concurrency, args.per_host, args.sites_at_once, args.parse_workers,
+                                       page_store, on_site=progress))
+    finally:
+        if page_store:
+            page_store.close()
+    print(orjson.dumps(counts).decode())
+    return 1 if counts[FAILED] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
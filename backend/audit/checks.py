@@ -1,6 +1,9 @@
 import re
 from bs4 import BeautifulSoup
 
+# The BeautifulSoup helpers are the reference for extract.metrics_from_tree, which the crawler
+# uses instead; tests/test_extract.py checks the two agree.
+
 def extract_text_word_count(soup: BeautifulSoup) -> int:
     text = soup.get_text(" ", strip=True)
     # remove repeated whitespace
@@ -41,22 +44,26 @@ def image_alt_counts(soup: BeautifulSoup) -> tuple[int, int]:
             missing += 1
     return total, missing
 
-def basic_speed_tips(soup: BeautifulSoup) -> list[str]:
+def speed_tips(scripts: int, stylesheets: int, images: int, images_missing_dims: int) -> list[str]:
     tips = []
-    scripts = soup.find_all("script")
-    if len(scripts) > 20:
+    if scripts > 20:
         tips.append("Many <script> tags detected. Consider bundling/minifying JS and loading non-critical scripts with defer/async.")
-    css = soup.find_all("link", rel=lambda v: v and "stylesheet" in v)
-    if len(css) > 10:
+    if stylesheets > 10:
         tips.append("Many CSS files detected. Consider bundling/minifying and removing unused CSS.")
-    images = soup.find_all("img")
-    if len(images) > 25:
+    if images > 25:
         tips.append("Many images on this page. Ensure compression + lazy-loading for offscreen images.")
+    # missing width/height attributes (layout shifts)
+    if images_missing_dims >= 10:
+        tips.append("Many images missing width/height. Add dimensions to reduce layout shifts (CLS).")
+    return tips
+
+def basic_speed_tips(soup: BeautifulSoup) -> list[str]:
+    scripts = soup.find_all("script")
+    css = soup.find_all("link", rel=lambda v: v and "stylesheet" in v)
+    images = soup.find_all("img")
     # check for missing width/height attributes (layout shifts)
     wh_missing = 0
     for img in images:
         if not img.get("width") or not img.get("height"):
             wh_missing += 1
-    if wh_missing >= 10:
-        tips.append("Many images missing width/height. Add dimensions to reduce layout shifts (CLS).")
-    return tips
\ No newline at end of file
+    return speed_tips(len(scripts), len(css), len(images), wh_missing)
\ No newline at end of file
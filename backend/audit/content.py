@@ -0,0 +1,65 @@
+import codecs
+import os
+import re
+import httpx
+
+# Page bodies are streamed: error pages and non-HTML responses (PDFs, images, video) are closed
+# after the headers, and HTML stops at MAX_BODY_BYTES. Decoding follows the browser order:
+# BOM, then the Content-Type charset, then a <meta> charset near the top, then UTF-8.
+MAX_BODY_BYTES = int(os.getenv("AUDIT_MAX_BODY_BYTES", 5 << 20))
+HTML_TYPES = frozenset(("text/html", "application/xhtml+xml"))
+CHARSET_PRESCAN = 1024  # bytes searched for a <meta> charset
+
+_META_CHARSET = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.I)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+# labels browsers read as windows-1252
+_ALIASES = {"iso-8859-1": "cp1252", "latin1": "cp1252", "latin-1": "cp1252", "us-ascii": "cp1252", "ascii": "cp1252"}
+# a <meta> that could be read as ASCII can't be UTF-16, whatever it says; only the header is believed
+_META_ALIASES = {**_ALIASES, "utf-16": "utf-8", "utf-16le": "utf-8", "utf-16be": "utf-8"}
+
+def media_type(content_type: str | None) -> str | None:
+    """"text/html; charset=utf-8" -> "text/html"."""
+    if not content_type:
+        return None
+    return content_type.split(";", 1)[0].strip().lower() or None
+
+def is_html(content_type: str | None) -> bool:
+    # no Content-Type at all: read it (bounded) and let the parser decide
+    mt = media_type(content_type)
+    return mt is None or mt in HTML_TYPES
+
+def _codec(label: str | None, aliases: dict[str, str] = _ALIASES) -> str | None:
+    if not label:
+        return None
+    label = label.strip().strip("\"'").lower()
+    try:
+        return codecs.lookup(aliases.get(label, label)).name
+    except LookupError:
+        return None
+
+def _declared_charset(content_type: str | None) -> str | None:
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value
+    return None
+
+def decode_html(body: bytes, content_type: str | None) -> str:
+    """Undecodable bytes become U+FFFD rather than failing the page."""
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return body.decode(encoding, "replace")
+    encoding = _codec(_declared_charset(content_type))
+    if encoding is None:
+        m = _META_CHARSET.search(body, 0, CHARSET_PRESCAN)
+        encoding = _codec(m[1].decode("ascii"), _META_ALIASES) if m else None
+    return body.decode(encoding or "utf-8", "replace")
+
+async def read_body(r: httpx.Response, limit: int = MAX_BODY_BYTES) -> tuple[bytes, bool]:
+    """Returns: (at most `limit` bytes of the decompressed body, whether it went on past that)."""
+    buf = bytearray()
+    async for chunk in r.aiter_bytes():
+        buf += chunk
+        if len(buf) > limit:
+            return bytes(buf[:limit]), True
+    return bytes(buf), False
@@ -1,24 +1,48 @@
+import asyncio
+import contextlib
+from array import array
+import itertools
+import multiprocessing
+import os
+import threading
 import time
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urlunparse
-from collections import deque, defaultdict
-
-from .utils import normalize_url, same_host, is_http_url, is_private_host
-from .checks import (
-    get_title, get_meta_description, heading_counts, get_h1_texts,
-    image_alt_counts, extract_text_word_count, basic_speed_tips
-)
+import httpx
+import numpy as np
+from urllib.parse import urljoin, urlparse, urlunparse
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import normalize_url, same_host, is_http_url, canonicalize_url
+from .checks import speed_tips
+from .extract import parse_html, metrics_from_tree
+from .content import MAX_BODY_BYTES, decode_html, is_html, media_type, read_body
+from .neardup import text_fingerprint
 from .models import PageData, Issue
-from .prioritize import classify_issues
-from .suggest import suggest_title, suggest_description, keyword_hits, content_tips
+from .prioritize import classify_issues, duplicate_issues, link_issues
+from .suggest import suggest_title, suggest_description, content_tips
+from .keywords import matcher_for, normalize_keywords
+from .transport import Transport, CONCURRENCY, PER_HOST_CONCURRENCY
+from .linkcheck import LinkChecker, is_broken
+from .pagestore import PageStore, analysis_key, content_hash
+from .reportstore import ReportWriter, page_rank
+from .frontier import Frontier
+from .linkgraph import LinkGraph
+from .robots import Robots, fetch_robots
+from .sitemaps import iter_sitemap_urls
+from . import metrics, timing
 
-LINK_TIMEOUT = 4
-MAX_LINK_CHECKS_PER_PAGE = 6
 CHECK_EXTERNAL_LINKS = False
-
-HEADERS = {"User-Agent": "SEOQuickAuditBot/1.0 (+https://example.com)"}
-TIMEOUT = 15
+RESPECT_ROBOTS = True  # skip what robots.txt disallows (the start URL is audited regardless) and honor Crawl-delay
+USE_SITEMAPS = True    # queue the sitemaps' pages at depth 1, next to the homepage's links
+BROKEN_LINKS_SHOWN = 200  # broken links listed in the report (a report store keeps them all)
+LATE_BATCH = 500          # pages' end-of-crawl numbers (and broken links) written to a report store at a time
+
+# Pipeline mode: processes parsing pages, and fetched pages each one may have waiting
+PARSE_WORKERS = 0
+PARSE_QUEUE_PER_WORKER = 2
+# Processes in the shared parse pool. Fixed: audits running at once all submit to the same pool,
+# so it is never resized or replaced; an audit asking for more parse_workers just queues more.
+PARSE_POOL_SIZE = int(os.getenv("AUDIT_PARSE_POOL_SIZE", os.cpu_count() or 1))
 
 def _strip_www(u: str) -> str:
     p = urlparse(u)
@@ -28,209 +52,608 @@ def _strip_www(u: str) -> str:
         return urlunparse((p.scheme, host, p.path, p.params, p.query, p.fragment))
     return u
 
-def fetch(url: str) -> tuple[int, str, float, str | None, str]:
+async def _get(transport: Transport, url: str, headers: dict | None, timings: dict | None
+               ) -> tuple[httpx.Response, str, bool]:
+    """Returns: (response, decoded html, truncated). Only an HTML body of a non-error response is read."""
+    extensions = {"trace": timing.trace(timings)} if timings is not None else None
+    body, truncated = b"", False
+    async with transport.limiter.slot(url):
+        async with transport.client.stream("GET", url, headers=headers, extensions=extensions) as r:
+            if r.status_code < 400 and is_html(r.headers.get("content-type")):
+                body, truncated = await read_body(r)
+    metrics.BYTES_FETCHED.inc(r.num_bytes_downloaded)
+    return r, decode_html(body, r.headers.get("content-type")) if body else "", truncated
+
+async def fetch(transport: Transport, url: str, headers: dict | None = None, timings: dict | None = None
+                ) -> tuple[int, str, float, str | None, str, httpx.Headers, bool]:
     """
-    Returns: (status, html, seconds, error, final_url_used)
-    status=0 means network/DNS failure.
+    Returns: (status, html, seconds, error, final_url_used, response_headers, truncated)
+    status=0 means network/DNS failure. html is "" for error statuses and non-HTML responses
+    (their bodies aren't downloaded), and at most MAX_BODY_BYTES long; truncated says it was cut.
+    With a timings dict, the request's dns/connect/ttfb/download times (ms) are added to it.
     """
     t0 = time.time()
+    token = timing.current.set(timings)
     try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT, allow_redirects=True)
-        return r.status_code, (r.text or ""), time.time() - t0, None, url
-    except requests.RequestException as e:
+        r, html, truncated = await _get(transport, url, headers, timings)
+        return r.status_code, html, time.time() - t0, None, url, r.headers, truncated
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
         # quick fallback: if www fails, try without www once
         alt = _strip_www(url)
         if alt != url:
             try:
-                r = requests.get(alt, headers=HEADERS, timeout=TIMEOUT, allow_redirects=True)
-                return r.status_code, (r.text or ""), time.time() - t0, None, alt
-            except requests.RequestException as e2:
-                return 0, "", time.time() - t0, f"{e} | fallback: {e2}", alt
-        return 0, "", time.time() - t0, str(e), url
-
-def check_link(url: str) -> int:
-    try:
-        r = requests.head(url, headers=HEADERS, timeout=LINK_TIMEOUT, allow_redirects=True)
-        if r.status_code >= 400 or r.status_code == 405:
-            r = requests.get(url, headers=HEADERS, timeout=LINK_TIMEOUT, allow_redirects=True)
-        return r.status_code
-    except requests.RequestException:
-        return 0  # unknown / failed
-
-def run_audit(url: str, target_keyword: str | None, max_pages: int = 25, max_depth: int = 2) -> dict:
-    if not is_http_url(url) or is_private_host(url):
-        return {"error": "Invalid or blocked URL."}
-
-    home = url
-    host = urlparse(home).netloc.lower()
-
-    visited = set()
-    pages: list[PageData] = []
-    q = deque([(home, 0)])
-
-    # Track duplicates
-    titles_map = defaultdict(list)
-    desc_map = defaultdict(list)
-
-    # Link problems
-    broken_links: list[dict] = []
-
-    while q and len(visited) < max_pages:
-        current, depth = q.popleft()
-        if current in visited or depth > max_depth:
-            continue
-        if not same_host(home, current):
+                r, html, truncated = await _get(transport, alt, headers, timings)
+                return r.status_code, html, time.time() - t0, None, alt, r.headers, truncated
+            except (httpx.HTTPError, httpx.InvalidURL) as e2:
+                return 0, "", time.time() - t0, f"{e} | fallback: {e2}", alt, httpx.Headers(), False
+        return 0, "", time.time() - t0, str(e), url, httpx.Headers(), False
+    finally:
+        timing.current.reset(token)
+
+def analyze_page(url: str, status: int, html: str, home: str, keywords: tuple[str, ...],
+                 content_type: str | None = None, truncated: bool = False) -> tuple[PageData, list[str]]:
+    """
+    Runs every per-page check on a fetched page, timing the parse / extract / checks stages.
+    keywords are the audit's target keywords (see keywords.normalize_keywords), primary first.
+    truncated: html is only the first MAX_BODY_BYTES of the page.
+    Returns: (page, links) where links are the absolute http(s) links found on it.
+    """
+    page = PageData(url=url, status=status, content_type=content_type)
+    links: list[str] = []
+
+    if not (html and status < 400):
+        return page, links
+
+    t0 = time.perf_counter()
+    root = parse_html(html)
+    t1 = time.perf_counter()
+    timing.add(page.timings, "parse", t1 - t0)
+
+    # one pass over the document for every metric below
+    m = metrics_from_tree(root)
+    page.title = m.title
+    page.meta_description = m.meta_description
+    page.headings = m.headings
+    page.h1 = m.h1
+    page.images_total, page.images_missing_alt = m.images_total, m.images_missing_alt
+    page.word_count = m.word_count
+    page.content_fingerprint = text_fingerprint(m.text)
+    page.speed_tips = speed_tips(m.scripts, m.stylesheets, m.images_total, m.images_missing_dims)
+
+    # links
+    internal = external = 0
+    for href in m.links:
+        full = normalize_url(url, href)
+        if not full or not is_http_url(full):
             continue
+        links.append(full)
+        if same_host(home, full):
+            internal += 1
+        else:
+            external += 1
+    page.internal_links = internal
+    page.external_links = external
+    t2 = time.perf_counter()
+    timing.add(page.timings, "extract", t2 - t1)
+
+    # keyword analysis: every target keyword in one pass over each text
+    primary = keywords[0] if keywords else None
+    hits = matcher_for(keywords).hits(m.text, page.title, page.h1) if keywords else {}
+    # the report keeps the primary keyword and the ones found; with hundreds of keywords the zeros add up
+    page.keyword_hits = {kw: h for kw, h in hits.items() if kw == primary or any(h.values())}
+
+    # suggestions
+    page.suggestions = {
+        "suggested_title": suggest_title(page.title, page.h1, primary),
+        "suggested_meta_description": suggest_description(page.meta_description, primary),
+    }
 
-        visited.add(current)
-
-        status, html, ttfb, err, final_url = fetch(current)
-
-# create page record first
-page = PageData(
-    url=final_url,   # or use current if you prefer
-    status=status,
-)
-
-# if fetch failed (DNS / network), record issue and move on
-if status == 0:
-    page.issues.append(Issue(
-        priority="P1",
-        code="FETCH_FAILED",
-        message=f"Failed to fetch page (DNS/network): {err}",
-        url=current,
-        fix="Try again later or audit a different URL. Some hosts fail DNS resolution from cloud servers intermittently."
-    ))
-    pages.append(page)
-    continue
-
-# only parse soup if fetch succeeded
-soup = BeautifulSoup(html, "lxml") if html else None
-        if soup and status < 400:
-            page.title = get_title(soup)
-            page.meta_description = get_meta_description(soup)
-            page.headings = heading_counts(soup)
-            page.h1 = get_h1_texts(soup)
-            page.images_total, page.images_missing_alt = image_alt_counts(soup)
-            page.word_count = extract_text_word_count(soup)
-            page.speed_tips = basic_speed_tips(soup)
-
-            # links
-            internal = external = 0
-            links = []
-            for a in soup.find_all("a"):
-                href = a.get("href")
-                full = normalize_url(current, href)
-                if not full or not is_http_url(full):
-                    continue
-                links.append(full)
-                if same_host(home, full):
-                    internal += 1
-                    # enqueue internal pages
-                    if full not in visited:
-                        q.append((full, depth + 1))
-                else:
-                    external += 1
-            page.internal_links = internal
-            page.external_links = external
-
-            # keyword analysis (basic)
-            if target_keyword:
-                visible_text = soup.get_text(" ", strip=True)
-                hits = keyword_hits(visible_text, target_keyword)
-                page.keyword_hits = {
-                    "in_text": hits,
-                    "in_title": keyword_hits(page.title or "", target_keyword),
-                    "in_h1": keyword_hits(" ".join(page.h1), target_keyword),
-                }
-
-            # suggestions
-            page.suggestions = {
-                "suggested_title": suggest_title(page.title, page.h1, target_keyword),
-                "suggested_meta_description": suggest_description(page.meta_description, target_keyword),
-            }
-
-            # issues
-            page.issues.extend(classify_issues(page))
-
-            # content tips
-            if target_keyword:
-                tips = content_tips(
-                    word_count=page.word_count,
-                    has_h1=(page.headings.get("h1", 0) > 0),
-                    keyword=target_keyword,
-                    keyword_count=page.keyword_hits.get("in_text", 0),
-                )
-                for tip in tips:
-                    page.issues.append(Issue(priority="P3", code="CONTENT_TIP", message=tip, url=page.url))
-
-            # duplicates tracking
-            if page.title:
-                titles_map[page.title.strip().lower()].append(page.url)
-            if page.meta_description:
-                desc_map[page.meta_description.strip().lower()].append(page.url)
-
-            # Check a small subset of links for broken (MVP: cap per page)
-            # Check a small subset of links for broken (FAST: cap + internal-first)
-checked = 0
-for link in links:
-    if checked >= MAX_LINK_CHECKS_PER_PAGE:
-        break
-
-    # Skip external links for speed (optional)
-    if not CHECK_EXTERNAL_LINKS and not same_host(home, link):
-        continue
-
-    code = check_link(link)
-    checked += 1
-
-    if code == 0 or code >= 400:
-        broken_links.append({"from": current, "to": link, "status": code})
-
-        pages.append(page)
+    # issues
+    page.issues.extend(classify_issues(page))
+    if truncated:
+        page.issues.append(Issue(priority="P2", code="HTML_TOO_LARGE",
+                                 message=f"Page HTML is over {MAX_BODY_BYTES >> 20} MB; only the start was audited.",
+                                 url=page.url,
+                                 fix="Trim inline scripts, styles and data. Search engines stop reading very large HTML (Google: 15 MB)."))
+
+    # content tips
+    if keywords:
+        tips = content_tips(
+            word_count=page.word_count,
+            has_h1=(page.headings.get("h1", 0) > 0),
+            keyword_hits=hits,
+        )
+        for tip in tips:
+            page.issues.append(Issue(priority="P3", code="CONTENT_TIP", message=tip, url=page.url))
+
+    timing.add(page.timings, "checks", time.perf_counter() - t2)
+    return page, links
+
+def _site_fields(page: PageData) -> PageData:
+    """What the end of an audit still needs of a page already written to a report store."""
+    return PageData(url=page.url, status=page.status, content_type=page.content_type, title=page.title,
+                    meta_description=page.meta_description, timings=page.timings,
+                    content_fingerprint=page.content_fingerprint)
+
+def build_report(home: str, keywords: tuple[str, ...], max_pages: int, max_depth: int,
+                 pages: list[PageData], broken_links: list[dict], cache_stats: dict | None = None,
+                 include_pages: bool = True, elapsed: float | None = None, discovery: dict | None = None,
+                 link_graph: dict | None = None, broken_total: int | None = None) -> dict:
+    """broken_links may be the first BROKEN_LINKS_SHOWN of broken_total."""
+    host = urlparse(home).netloc.lower()
+    broken_total = len(broken_links) if broken_total is None else broken_total
 
-    # Global duplicate issues
-    global_issues: list[Issue] = []
-    for t, urls in titles_map.items():
-        if len(urls) >= 2:
-            for u in urls:
-                global_issues.append(Issue(priority="P2", code="DUPLICATE_TITLE",
-                                           message=f"Duplicate title used on {len(urls)} pages.", url=u,
-                                           fix="Make each page title unique and specific to that page."))
+    # Global duplicate issues: exact and near-duplicate titles, descriptions and content
+    global_issues: list[Issue] = duplicate_issues(pages)
 
     # Broken links summary issues
-    if broken_links:
+    if broken_total:
         global_issues.append(Issue(priority="P1", code="BROKEN_LINKS_FOUND",
-                                   message=f"Found {len(broken_links)} broken link(s).",
+                                   message=f"Found {broken_total} broken link(s).",
                                    details={"examples": broken_links[:20]},
                                    fix="Fix or remove broken links. Redirect removed pages, update old URLs."))
 
-    # Build priority buckets
-    def bucket(priority: str) -> list[dict]:
-        out = []
-        for p in pages:
-            for issue in p.issues:
-                if issue.priority == priority:
-                    out.append(issue.model_dump())
-        for gi in global_issues:
-            if gi.priority == priority:
-                out.append(gi.model_dump())
-        return out
+    # Build priority buckets: one pass over every issue, page issues first
+    buckets: dict[str, list[dict]] = {"P1": [], "P2": [], "P3": []}
+    for p in pages:
+        for issue in p.issues:
+            bucket = buckets.get(issue.priority)
+            if bucket is not None:
+                bucket.append(issue.to_dict())
+    for gi in global_issues:
+        bucket = buckets.get(gi.priority)
+        if bucket is not None:
+            bucket.append(gi.to_dict())
 
     report = {
         "site": {"url": home, "host": host, "pages_crawled": len(pages)},
-        "inputs": {"target_keyword": target_keyword, "max_pages": max_pages, "max_depth": max_depth},
-        "priority_fixes": {
-            "P1": bucket("P1"),
-            "P2": bucket("P2"),
-            "P3": bucket("P3"),
-        },
-        "pages": [p.model_dump() for p in pages],
-        "broken_links": broken_links[:200],
+        "inputs": {"target_keyword": keywords[0] if keywords else None, "target_keywords": list(keywords),
+                   "max_pages": max_pages, "max_depth": max_depth},
+        "priority_fixes": buckets,
+    }
+    if include_pages:
+        report["pages"] = [p.to_dict() for p in pages]
+    report["broken_links"] = broken_links[:BROKEN_LINKS_SHOWN]
+    if discovery is not None:
+        report["discovery"] = discovery
+    if link_graph is not None:
+        report["link_graph"] = link_graph
+    if cache_stats is not None:
+        report["cache"] = cache_stats
+    report["timings"] = {
+        "audit_ms": round(elapsed * 1000, 2) if elapsed is not None else None,
+        "stages": timing.summarize([p.timings for p in pages]),
     }
-
     return report
 
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_lock = threading.Lock()
 
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every pipelined audit in this process (PARSE_POOL_SIZE processes,
+    spawned once, never shut down). spawn rather than fork: the API process is multi-threaded.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_POOL_SIZE,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+async def iter_audit(url: str, target_keyword: str | None, max_pages: int = 25, max_depth: int = 2,
+                     concurrency: int = CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                     parse_workers: int = PARSE_WORKERS, page_store: PageStore | None = None,
+                     include_pages: bool = True, target_keywords: list[str] | None = None,
+                     transport: Transport | None = None, report_writer: ReportWriter | None = None
+                     ) -> AsyncIterator[tuple[str, PageData | dict]]:
+    """
+    Streaming form of the audit. Yields ("page", PageData) as soon as each page is analyzed, then
+    one ("report", dict) with the site-wide sections; its "pages" list is left out when
+    include_pages=False (the caller already has them). Invalid or blocked URLs yield only
+    ("report", {"error": ...}).
+
+    Concurrent crawl: `concurrency` workers share one frontier that hands pages out in the order a
+    one-at-a-time BFS would take them (see Frontier), so the report lists them in BFS order and the
+    pages kept at the max_pages cut-off are the same from run to run. URLs are canonicalized and
+    deduplicated as they are queued, and a large frontier spills to disk.
+
+    parse_workers=0 analyzes pages inline on the event loop. With parse_workers > 0 the audit runs
+    as a pipeline: fetchers hand raw pages to a bounded queue (so they stall instead of buffering
+    when parsing falls behind), and that many parsers turn them into PageData in the shared
+    process pool (get_parse_pool) while the next pages download.
+
+    With a page_store, pages are fetched conditionally against the last audit's validators;
+    a 304 or an unchanged body reuses the stored analysis instead of re-parsing.
+
+    Every page carries its stage timings (see timing.STAGES). link_check is only known once all
+    checks are done, so it is added to the pages in the final report, not to the streamed ones.
+    The same goes for the link graph numbers (inbound_links, click_depth, pagerank) and the
+    issues drawn from them: the internal links of every crawled page are kept as a compact
+    graph (audit/linkgraph.py) that is only complete once the crawl is.
+
+    target_keywords are counted alongside target_keyword, which stays the primary one.
+
+    Before crawling, robots.txt is read: disallowed URLs are neither crawled nor link-checked,
+    and its Crawl-delay spaces out requests to the host. Sitemap pages (from robots.txt's Sitemap
+    lines, else /sitemap.xml) are queued at depth 1 while the crawl runs.
+
+    A transport passed in is shared with other audits (see audit/batch.py): its limiter caps them
+    all together, and it stays open afterwards. Otherwise the audit opens its own.
+
+    With a report_writer, each page is written to the report store as it finishes and only the
+    fields the site-wide checks need stay in memory; the final event is the stored summary
+    (ReportWriter.finish) rather than the full report.
+    """
+    if not is_http_url(url):
+        metrics.AUDITS.labels("invalid").inc()
+        yield "report", {"error": "Invalid or blocked URL."}
+        return
+
+    home = canonicalize_url(url)
+    keywords = normalize_keywords(target_keyword, target_keywords)
+    if keywords:
+        matcher_for(keywords)  # built once, up front; each parse worker builds its own on its first page
+    frontier = Frontier()
+    frontier.add(home, 0)
+    crawled = 0
+
+    # (depth, seq, graph node, page, url, ids of the links to check): links are numbered in
+    # link_ids, so a page holds 4 bytes a link however long the URLs
+    results: list[tuple[int, int, int, PageData, str, array]] = []
+    link_ids: dict[str, int] = {}
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool() if parse_workers > 0 else None
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=parse_workers * PARSE_QUEUE_PER_WORKER or 1)
+    shared_transport = transport is not None
+    transport = transport or Transport(concurrency, per_host_concurrency)
+    checker = LinkChecker(transport)
+    params = analysis_key(home, keywords)
+    cache_stats = {"reused": 0, "recomputed": 0, "not_cached": 0}
+    finished: asyncio.Queue = asyncio.Queue()  # pages ready to stream, then None
+    robots = Robots()
+    sitemaps: list[str] = []
+    seeded = 0
+    disallowed: dict[str, None] = {}  # internal links robots.txt keeps us from, in discovery order
+    graph = LinkGraph()  # node ids follow `results` order
+    graph_complete = True  # every internal link found led to a crawled (or disallowed) page
+
+    def record(depth: int, order: int, current: str, status: int, page: PageData, links: list[str],
+               fetched: dict):
+        nonlocal graph_complete
+        page.timings = fetched | page.timings
+        metrics.observe_page(page.timings)
+        # a crawled page doubles as the link check for every link pointing at it
+        checker.record(current, status)
+        to_check = array("i")
+        internal_links = []
+        for full in dict.fromkeys(links):
+            internal = same_host(home, full)
+            if internal:
+                internal_links.append(full)
+            if internal and not robots.allowed(full):
+                disallowed[full] = None
+                continue
+            # enqueue internal pages (the frontier drops ones already queued or crawled)
+            queued = internal and depth < max_depth and crawled < max_pages
+            if queued:
+                frontier.add(full, depth + 1, parent=order)
+            # Skip external links for speed (optional)
+            if not internal and not CHECK_EXTERNAL_LINKS:
+                continue
+            to_check.append(link_ids.setdefault(full, len(link_ids)))
+            # links the crawl is about to fetch anyway get checked after it, only if it didn't
+            if not (internal and (queued or frontier.is_seen(full))):
+                checker.submit(full)
+                if internal:
+                    graph_complete = False  # past max_depth or the page budget
+        node = graph.add_page(current, internal_links)
+        if report_writer is None:
+            results.append((depth, order, node, page, current, to_check))
+        else:
+            report_writer.add_page(page_rank(depth, order), page)
+            results.append((depth, order, node, _site_fields(page), current, to_check))
+        finished.put_nowait(page)
+
+    async def analyze(depth: int, order: int, current: str, status: int, html: str, final_url: str,
+                      validators: tuple[str | None, str | None, str] | None, fetched: dict,
+                      content_type: str | None, truncated: bool):
+        if pool is None:
+            page, links = analyze_page(final_url, status, html, home, keywords, content_type, truncated)
+        else:
+            page, links = await loop.run_in_executor(pool, analyze_page, final_url, status, html, home, keywords,
+                                                     content_type, truncated)
+        if validators is not None:
+            if html and status < 400:
+                cache_stats["recomputed"] += 1
+                page_store.put(current, params, status, *validators, page, links)
+            else:
+                cache_stats["not_cached"] += 1  # error and non-HTML pages aren't stored, so never reused
+        metrics.PAGES.labels("fetched").inc()
+        record(depth, order, current, status, page, links, fetched)
+
+    async def crawl_one(depth: int, order: int, current: str) -> bool:
+        """Returns True once the page is fully handled, False if it was handed to the parse stage."""
+        cached = page_store.get(current, params) if page_store else None
+        fetched: dict = {}
+        status, html, _elapsed, err, final_url, headers, truncated = await fetch(
+            transport, current, cached.conditional_headers() if cached else None, fetched)
+        content_type = media_type(headers.get("content-type"))
+
+        # if fetch failed (DNS / network), record issue and move on
+        if status == 0:
+            page = PageData(url=final_url, status=status)
+            page.issues.append(Issue(
+                priority="P1",
+                code="FETCH_FAILED",
+                message=f"Failed to fetch page (DNS/network): {err}",
+                url=current,
+                fix="Try again later or audit a different URL. Some hosts fail DNS resolution from cloud servers intermittently."
+            ))
+            metrics.PAGES.labels("failed").inc()
+            record(depth, order, current, status, page, [], fetched)
+            return True
+
+        validators = None
+        if page_store:
+            chash = content_hash(html)
+            etag, last_modified = headers.get("etag"), headers.get("last-modified")
+            if cached and (status == 304 or (status == cached.status and chash == cached.content_hash)):
+                page_store.revalidated(current, params, etag, last_modified)
+                cache_stats["reused"] += 1
+                metrics.CACHE.labels("page", "hit").inc()
+                metrics.PAGES.labels("reused").inc()
+                cached.page.timings = {}  # the stored parse/check times belong to an earlier audit
+                record(depth, order, current, cached.status, cached.page, cached.links, fetched)
+                return True
+            metrics.CACHE.labels("page", "miss").inc()
+            validators = (etag, last_modified, chash)
+
+        if pool is None:
+            await analyze(depth, order, current, status, html, final_url, validators, fetched, content_type, truncated)
+            return True
+        await parse_q.put((depth, order, current, status, html, final_url, validators, fetched, content_type, truncated))
+        return False
+
+    async def fetcher():
+        nonlocal crawled, graph_complete
+        while True:
+            depth, order, current = await frontier.get()
+            handled = True
+            try:
+                if crawled >= max_pages:
+                    frontier.clear()  # budget spent: nothing else queued will be crawled
+                    graph_complete = False
+                    continue
+                crawled += 1
+                handled = await crawl_one(depth, order, current)
+            finally:
+                # a page handed to the parse stage is marked done there, after its links are enqueued
+                if handled:
+                    frontier.task_done(order)
+
+    async def seed():
+        # sitemap pages go in as if the homepage linked to them after its own links, up to the page
+        # budget; deeper pages wait for the seeding (frontier.hold) so the crawl order doesn't
+        # depend on how fast the sitemaps download
+        nonlocal seeded
+        try:
+            async with contextlib.aclosing(iter_sitemap_urls(transport, sitemaps)) as urls:
+                async for loc in urls:
+                    if crawled >= max_pages or seeded >= max_pages - 1:
+                        break
+                    if not same_host(home, loc):
+                        continue
+                    if not robots.allowed(loc):
+                        disallowed[loc] = None
+                    elif frontier.add(loc, 1, parent=0, late=True):
+                        seeded += 1
+        finally:
+            frontier.release()
+
+    async def parser():
+        while True:
+            item = await parse_q.get()
+            try:
+                await analyze(*item)
+            finally:
+                frontier.task_done(item[1])
+
+    async def crawl():
+        workers = [asyncio.create_task(fetcher()) for _ in range(concurrency)]
+        workers += [asyncio.create_task(parser()) for _ in range(parse_workers)]
+        seeder = None
+        if sitemaps:
+            frontier.hold()
+            seeder = asyncio.create_task(seed())
+
+        async def drain():
+            # the crawl is over once seeding is done and the frontier is empty
+            if seeder is not None:
+                await seeder
+            await frontier.join()
+        drained = asyncio.create_task(drain())
+        tasks = [drained, *workers] + ([seeder] if seeder else [])
+        try:
+            done, _ = await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                t.result()  # a worker or the seeding crashed: surface its exception
+            # whatever the crawl didn't reach still needs its own check
+            for link in link_ids:
+                checker.submit(link)
+            await checker.wait()
+        finally:
+            await checker.aclose()
+            frontier.close()
+            if page_store:
+                page_store.flush()
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            finished.put_nowait(None)
+
+    started = time.perf_counter()
+    async with contextlib.nullcontext() if shared_transport else transport:
+        # SSRF guard: resolves through the audit's DNS cache, which every later connect reuses
+        if await transport.is_blocked(home):
+            metrics.AUDITS.labels("invalid").inc()
+            yield "report", {"error": "Invalid or blocked URL."}
+            return
+        if RESPECT_ROBOTS:
+            robots = await fetch_robots(transport, home)
+            if robots.crawl_delay:
+                transport.limiter.set_delay(home, robots.crawl_delay)
+        if USE_SITEMAPS and max_depth >= 1 and max_pages > 1:
+            sitemaps = robots.sitemaps or [urljoin(home, "/sitemap.xml")]
+        crawler = asyncio.create_task(crawl())
+        metrics.AUDITS_IN_FLIGHT.inc()
+        try:
+            while (page := await finished.get()) is not None:
+                yield "page", page
+            await crawler
+        except BaseException:
+            metrics.AUDITS.labels("aborted").inc()
+            raise
+        finally:
+            # also runs when the consumer stops early (client disconnected)
+            metrics.AUDITS_IN_FLIGHT.dec()
+            crawler.cancel()
+            await asyncio.gather(crawler, return_exceptions=True)
+
+    # link graph numbers, by graph node (record order); numpy releases the GIL, other audits keep going
+    stats = await asyncio.to_thread(graph.stats, home)
+    inbound, click_depths, ranks = stats.inbound.tolist(), stats.click_depth.tolist(), (stats.pagerank * len(graph)).tolist()
+    depth_counts = np.bincount(stats.click_depth[stats.click_depth >= 0]).tolist()
+    # node ids follow the order pages finished in: rank ties go by report order instead, and on the
+    # rounded value the report shows, so float noise from the numbering can't reorder them
+    report_order = np.empty(len(results), dtype=np.int64)
+    for depth, order, node, *_ in results:
+        report_order[node] = page_rank(depth, order)
+    top = np.lexsort((report_order, -np.round(stats.pagerank * len(graph), 3)))[:10].tolist()
+    link_graph = {
+        "pages": len(graph),
+        "links": stats.links,
+        "complete": graph_complete,  # False: inbound counts miss the pages the crawl didn't reach
+        "click_depths": {str(d): c for d, c in enumerate(depth_counts) if c},
+        "unreachable": int((stats.click_depth < 0).sum()),
+        "top_pages": [{"url": results[i][3].url, "pagerank": round(ranks[i], 3), "inbound_links": inbound[i]}
+                      for i in top],
+    }
 
+    # One pass in report order attributes the graph numbers, link checks and broken links to pages.
+    # With a report_writer they go to the store as they are worked out, a batch at a time, and
+    # only the broken links the report shows stay in memory.
+    results.sort(key=lambda r: (r[0], r[1]))
+    link_urls = list(link_ids)
+    pages = []
+    broken_links = []  # the first BROKEN_LINKS_SHOWN
+    broken_total = 0
+    broken_batch: list[dict] = []
+    late_patches: dict[int, dict] = {}
+    late_issues: dict[int, list[Issue]] = {}
+    charged = bytearray(len(link_urls))  # each check's time goes to the first page that links to it
+    for depth, order, node, page, current, to_check in results:
+        pages.append(page)
+        clicks = click_depths[node]
+        page.inbound_links, page.click_depth, page.pagerank = inbound[node], clicks if clicks >= 0 else None, round(ranks[node], 3)
+        issues = link_issues(page, graph_complete)
+        spent = None
+        for link in to_check:
+            url = link_urls[link]
+            code = checker.status(url)
+            if code is not None and is_broken(code):
+                broken = {"from": current, "to": url, "status": code}
+                broken_total += 1
+                if len(broken_links) < BROKEN_LINKS_SHOWN:
+                    broken_links.append(broken)
+                if report_writer is not None:
+                    broken_batch.append(broken)
+            seconds = checker.elapsed(url)
+            if seconds is not None and not charged[link]:
+                charged[link] = 1
+                spent = (spent or 0.0) + seconds
+        if spent is not None:
+            timing.add(page.timings, "link_check", spent)
+            metrics.STAGE_SECONDS.labels("link_check").observe(spent)
+        if report_writer is None:
+            page.issues.extend(issues)
+            continue
+        rank = page_rank(depth, order)
+        late_patches[rank] = {"inbound_links": page.inbound_links, "click_depth": page.click_depth,
+                              "pagerank": page.pagerank}
+        if spent is not None:
+            late_patches[rank]["timings"] = {"link_check": page.timings["link_check"]}
+        if issues:
+            late_issues[rank] = issues
+        if len(late_patches) >= LATE_BATCH:
+            report_writer.update_pages(late_patches, late_issues)
+            late_patches, late_issues = {}, {}
+        if len(broken_batch) >= LATE_BATCH:
+            report_writer.add_broken_links(broken_batch)
+            broken_batch = []
+    if report_writer is not None:
+        # the pages (and their issues) are in the store already; the report's buckets hold the site-wide issues
+        report_writer.update_pages(late_patches, late_issues)
+        report_writer.add_broken_links(broken_batch)
+
+    elapsed = time.perf_counter() - started
+    metrics.AUDITS.labels("done").inc()
+    metrics.AUDIT_SECONDS.observe(elapsed)
+    metrics.AUDIT_PAGES_PER_SECOND.observe(len(pages) / elapsed if elapsed else 0.0)
+    discovery = {
+        "robots_txt": robots.found,
+        "crawl_delay": robots.crawl_delay,
+        "sitemaps": sitemaps,
+        "sitemap_pages_queued": seeded,
+        "disallowed_urls": len(disallowed),
+        "disallowed_examples": list(itertools.islice(disallowed, 20)),
+    }
+    report = build_report(home, keywords, max_pages, max_depth, pages, broken_links,
+                          cache_stats if page_store else None, include_pages=include_pages and report_writer is None,
+                          elapsed=elapsed, discovery=discovery, link_graph=link_graph, broken_total=broken_total)
+    if report_writer is not None:
+        report = report_writer.finish(report)
+    yield "report", report
+
+async def audit_site(url: str, target_keyword: str | None, max_pages: int = 25, max_depth: int = 2,
+                     concurrency: int = CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                     parse_workers: int = PARSE_WORKERS, page_store: PageStore | None = None,
+                     target_keywords: list[str] | None = None) -> dict:
+    report = {}
+    async for kind, item in iter_audit(url, target_keyword, max_pages, max_depth, concurrency,
+                                       per_host_concurrency, parse_workers, page_store,
+                                       target_keywords=target_keywords):
+        if kind == "report":
+            report = item
+    return report
 
+def run_audit(url: str, target_keyword: str | None, max_pages: int = 25, max_depth: int = 2,
+              concurrency: int = CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+              parse_workers: int = PARSE_WORKERS, page_store: PageStore | None = None,
+              target_keywords: list[str] | None = None) -> dict:
+    return asyncio.run(audit_site(url, target_keyword, max_pages, max_depth, concurrency, per_host_concurrency,
+                                  parse_workers, page_store, target_keywords))
+
+def run_audit_iter(url: str, target_keyword: str | None, max_pages: int = 25, max_depth: int = 2,
+                   concurrency: int = CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                   parse_workers: int = PARSE_WORKERS, page_store: PageStore | None = None,
+                   target_keywords: list[str] | None = None) -> Iterator[tuple[str, PageData | dict]]:
+    """
+    Generator form of run_audit: the events of iter_audit (include_pages=False), driven on a private
+    event loop. The crawl only advances while the caller is pulling, so a slow consumer throttles it.
+    """
+    loop = asyncio.new_event_loop()
+    events = iter_audit(url, target_keyword, max_pages, max_depth, concurrency, per_host_concurrency,
+                        parse_workers, page_store, include_pages=False, target_keywords=target_keywords)
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
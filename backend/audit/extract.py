@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from lxml import etree
+
+# Strings inside these tags aren't visible text (same set BeautifulSoup's get_text skips)
+_INVISIBLE = frozenset(("script", "style", "template", "rt", "rp"))
+_HEADINGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+
+@dataclass
+class PageMetrics:
+    title: str | None = None
+    meta_description: str | None = None
+    headings: dict = field(default_factory=lambda: {f"h{lvl}": 0 for lvl in range(1, 7)})
+    h1: list[str] = field(default_factory=list)
+    images_total: int = 0
+    images_missing_alt: int = 0
+    images_missing_dims: int = 0
+    scripts: int = 0
+    stylesheets: int = 0
+    links: list[str] = field(default_factory=list)  # raw href of every <a>, in document order
+    text: str = ""                                  # visible text, strings joined by " "
+    word_count: int = 0
+
+def parse_html(html: str | bytes):
+    """Returns: the lxml root element, or None for an empty document."""
+    if not html:
+        return None
+    if isinstance(html, str):
+        # already decoded: stop libxml2 from re-reading a <meta charset>
+        return etree.fromstring(html.encode("utf-8"), etree.HTMLParser(encoding="utf-8"))
+    return etree.fromstring(html, etree.HTMLParser())
+
+def extract_metrics(html: str | bytes) -> PageMetrics:
+    """
+    Collects everything the per-page checks need in one walk of an lxml tree.
+    Values match the BeautifulSoup helpers in checks.py (tests/test_extract.py holds them to it).
+    """
+    return metrics_from_tree(parse_html(html))
+
+def metrics_from_tree(root) -> PageMetrics:
+    """extract_metrics on an already parsed document (see parse_html)."""
+    m = PageMetrics()
+    if root is None:
+        return m
+
+    strings: list[str] = []
+    invisible = 0              # depth inside script/style/...
+    title_parts: list[str] | None = None
+    title_done = meta_done = False
+    h1_all: list[list[str]] = []   # one collector per <h1>, in document order
+    h1_open: list[list[str]] = []  # the ones still open (they can nest)
+
+    def add(s: str | None, visible: bool):
+        if not s or not visible:
+            return
+        s = s.strip()
+        if not s:
+            return
+        strings.append(s)
+        if title_parts is not None:
+            title_parts.append(s)
+        for parts in h1_open:
+            parts.append(s)
+
+    for event, el in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        if event in ("comment", "pi"):
+            add(el.tail, not invisible)
+            continue
+        tag = el.tag if isinstance(el.tag, str) else ""
+
+        if event == "start":
+            if tag in _INVISIBLE:
+                invisible += 1
+
+            if tag == "title" and not title_done:
+                title_parts = []
+            elif tag in _HEADINGS:
+                m.headings[tag] += 1
+                if tag == "h1":
+                    h1_all.append([])
+                    h1_open.append(h1_all[-1])
+            elif tag == "meta":
+                if not meta_done and (el.get("name") or "").lower() == "description":
+                    m.meta_description = (el.get("content") or "").strip() or None
+                    meta_done = True
+            elif tag == "img":
+                m.images_total += 1
+                alt = el.get("alt")
+                if alt is None or alt.strip() == "":
+                    m.images_missing_alt += 1
+                if not el.get("width") or not el.get("height"):
+                    m.images_missing_dims += 1
+            elif tag == "script":
+                m.scripts += 1
+            elif tag == "link":
+                if "stylesheet" in (el.get("rel") or "").split():
+                    m.stylesheets += 1
+            elif tag == "a":
+                m.links.append(el.get("href"))
+
+            add(el.text, not invisible)
+        else:
+            if tag in _INVISIBLE:
+                invisible -= 1
+            if tag == "title" and title_parts is not None:
+                m.title = "".join(title_parts) or None
+                title_parts, title_done = None, True
+            elif tag == "h1":
+                h1_open.pop()
+            add(el.tail, not invisible)
+
+    m.h1 = [" ".join(parts) for parts in h1_all if parts]
+    m.text = " ".join(strings)
+    m.word_count = sum(len(s.split()) for s in strings)
+    return m
@@ -0,0 +1,259 @@
+import asyncio
+import functools
+import hashlib
+import math
+import os
+import tempfile
+from collections import deque
+from collections.abc import Callable
+
+from .utils import canonicalize_url
+
+# Memory bounds for large crawls: URLs held in RAM across all depths before the tail of each
+# depth's queue spills to a temp file, and seen-URL keys kept exactly before the Bloom filter
+# takes over.
+FRONTIER_MEMORY_ITEMS = 50_000
+SEEN_EXACT_LIMIT = 200_000
+BLOOM_CAPACITY = 2_000_000
+BLOOM_ERROR_RATE = 1e-4
+SPILL_READ_BATCH = 1000  # URLs read back from a spill file at a time
+
+def dedup_key(canonical: str) -> str:
+    """A canonical URL minus its trailing slash, so /about and /about/ are crawled once."""
+    base, q, query = canonical.partition("?")
+    if base.endswith("/"):
+        base = base.rstrip("/")
+        if base.count("/") < 3:  # "http://host" -> keep the root slash
+            base += "/"
+    return base + q + query
+
+class BloomFilter:
+    """Fixed-size set of strings with no false negatives and about error_rate false positives at capacity."""
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class SeenSet:
+    """
+    URLs already queued or crawled. Exact up to `exact_limit` keys; past that new keys go into a
+    Bloom filter, so memory stops growing and a rare false positive skips a never-seen URL.
+    """
+    def __init__(self, exact_limit: int = SEEN_EXACT_LIMIT):
+        self.exact_limit = exact_limit
+        self._exact: set[str] = set()
+        self._bloom: BloomFilter | None = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact or (self._bloom is not None and key in self._bloom)
+
+    def add(self, key: str) -> None:
+        if len(self._exact) < self.exact_limit:
+            self._exact.add(key)
+            return
+        if self._bloom is None:
+            self._bloom = BloomFilter()
+        self._bloom.add(key)
+
+class _DepthQueue:
+    """FIFO of URLs for one depth. Once the tail spills to a file, later items go there too, to keep the order."""
+    def __init__(self, spill_path: Callable[[], str]):
+        self._mem: deque[str] = deque()
+        self._spill_path = spill_path
+        self._spill = None
+        self._read_pos = 0
+        self._spilled = 0  # items in the file not yet read back
+
+    def __len__(self) -> int:
+        return len(self._mem) + self._spilled
+
+    def in_memory(self) -> int:
+        return len(self._mem)
+
+    def push(self, url: str, spill: bool) -> None:
+        if not (spill or self._spilled):
+            self._mem.append(url)
+            return
+        if self._spill is None:
+            self._spill = open(self._spill_path(), "w+", encoding="utf-8", newline="\n")
+        self._spill.seek(0, os.SEEK_END)
+        self._spill.write(f"{url}\n")
+        self._spilled += 1
+
+    def pop(self) -> str:
+        if not self._mem:
+            self._refill()
+        return self._mem.popleft()
+
+    def _refill(self) -> None:
+        self._spill.flush()
+        self._spill.seek(self._read_pos)
+        for _ in range(min(SPILL_READ_BATCH, self._spilled)):
+            self._mem.append(self._spill.readline().rstrip("\n"))
+            self._spilled -= 1
+        self._read_pos = self._spill.tell()
+        if not self._spilled:
+            # fully read back: start the next spill from an empty file
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._read_pos = 0
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._mem.clear()
+        self._spilled = 0
+
+class Frontier:
+    """
+    The crawl queue. URLs are canonicalized and deduplicated when they are queued, so each page
+    is queued once however many pages link to it; get() hands them out shallowest depth first.
+    Past `memory_items` queued URLs the rest wait in temp files.
+
+    Order is the sequential BFS's even though pages finish out of order: a page's links
+    (add(..., parent=its seq)) are held back until every page handed out before it is done,
+    then queued in link order. So URLs queue in (parent seq, link index) order, each at the
+    first place a one-at-a-time crawl would have found it, and the seq get() hands out is the
+    page's position in that crawl. hold() keeps the links of every page after the start page
+    back as well (while sitemap entries, queued as the start page's late links, stream in).
+
+    Same get / task_done / join protocol as asyncio.Queue; add() is the put_nowait.
+    """
+    def __init__(self, memory_items: int = FRONTIER_MEMORY_ITEMS, exact_seen: int = SEEN_EXACT_LIMIT):
+        self.memory_items = memory_items
+        self.seen = SeenSet(exact_seen)
+        self._queues: dict[int, _DepthQueue] = {}
+        self._size = 0
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._ready = asyncio.Event()
+        self._tmpdir: tempfile.TemporaryDirectory | None = None
+        self._handed_out = 0                     # seq of the next get()
+        self._released = 0                       # pages before this seq have had their links queued
+        self._done: set[int] = set()             # finished seqs at or past _released
+        self._pending: dict[int, list[tuple[str, int, str, bool]]] = {}  # parent seq -> [(url, depth, key, late)]
+        self._pending_keys: dict[str, int] = {}  # key -> pending entries with it
+        self._holds = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def is_seen(self, url: str) -> bool:
+        """Queued, crawled, or waiting in a page's held-back links."""
+        key = dedup_key(canonicalize_url(url))
+        return key in self.seen or key in self._pending_keys
+
+    def add(self, url: str, depth: int, parent: int | None = None, late: bool = False) -> bool:
+        """
+        parent: the seq of the page linking to url, None for a start URL. late: after the parent's
+        own links (sitemap entries). Returns: False when the URL was already queued or crawled.
+        """
+        url = canonicalize_url(url)
+        key = dedup_key(url)
+        if key in self.seen or "\n" in url or "\r" in url:
+            return False
+        if parent is None or parent < self._released:
+            # a released page's links went in already; late ones arriving now go in behind them
+            return self._push(url, key, depth)
+        self._pending.setdefault(parent, []).append((url, depth, key, late))
+        self._pending_keys[key] = self._pending_keys.get(key, 0) + 1
+        return True
+
+    def _push(self, url: str, key: str, depth: int) -> bool:
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        q = self._queues.get(depth)
+        if q is None:
+            q = self._queues[depth] = _DepthQueue(functools.partial(self._spill_path, depth))
+        in_memory = sum(dq.in_memory() for dq in self._queues.values())
+        q.push(url, spill=in_memory >= self.memory_items)
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._ready.set()
+        return True
+
+    def _release(self) -> None:
+        # queue the links of finished pages, in seq order, up to the first page still in progress
+        while self._released in self._done and not (self._holds and self._released > 0):
+            self._done.discard(self._released)
+            links = self._pending.pop(self._released, [])
+            links.sort(key=lambda link: link[3])  # stable: the page's own links, then its late ones
+            for url, depth, key, _late in links:
+                self._pending_keys[key] -= 1
+                if not self._pending_keys[key]:
+                    del self._pending_keys[key]
+                self._push(url, key, depth)
+            self._released += 1
+
+    def hold(self) -> None:
+        """Holds back the links of every page but the start page until release()."""
+        self._holds += 1
+
+    def release(self) -> None:
+        self._holds -= 1
+        self._release()
+
+    def _spill_path(self, depth: int) -> str:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="audit-frontier-")
+        return os.path.join(self._tmpdir.name, f"depth-{depth}.txt")
+
+    async def get(self) -> tuple[int, int, str]:
+        """Returns: (depth, seq, url) of the next URL to crawl; seq counts up from 0 in get() order."""
+        while not self._size:
+            self._ready.clear()
+            await self._ready.wait()
+        depth = min(d for d, q in self._queues.items() if len(q))
+        url = self._queues[depth].pop()
+        self._size -= 1
+        seq = self._handed_out
+        self._handed_out += 1
+        return depth, seq, url
+
+    def task_done(self, seq: int) -> None:
+        """seq's page is done, and its links added: they are queued once every earlier page is done too."""
+        self._done.add(seq)
+        self._release()
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
+
+    def clear(self) -> None:
+        """Drops every queued URL and held-back link (e.g. once the page budget is spent); queued ones stay marked as seen."""
+        for q in self._queues.values():
+            q.close()
+        self._queues.clear()
+        self._pending.clear()
+        self._pending_keys.clear()
+        self._unfinished -= self._size
+        self._size = 0
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    def close(self) -> None:
+        for q in self._queues.values():
+            q.close()
+        self._queues.clear()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
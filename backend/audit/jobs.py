@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+
+from .crawler import iter_audit
+from .pagestore import PageStore
+from .reportstore import ReportStore
+from .resultcache import AuditCache, audit_key
+
+MAX_CONCURRENT_AUDITS = 4  # audits running at once (one worker thread each)
+MAX_QUEUED_JOBS = 100      # submitted but not started; past this, submit() refuses
+RESULT_TTL = 3600          # seconds a finished job (and its report) is kept
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+class JobQueueFull(Exception):
+    pass
+
+@dataclass
+class Job:
+    id: str
+    params: dict
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    pages_done: int = 0
+    error: str | None = None
+    result: dict | None = None
+
+    def summary(self) -> dict:
+        d = asdict(self)
+        del d["result"]
+        return d
+
+class JobStore(ABC):
+    """Where jobs live. Subclass to keep them somewhere shared (Redis, a database...)."""
+    @abstractmethod
+    def save(self, job: Job) -> None: ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None: ...
+
+    @abstractmethod
+    def purge(self, finished_before: float) -> None:
+        """Drop finished jobs older than the cutoff."""
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def purge(self, finished_before: float) -> None:
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < finished_before]:
+                del self._jobs[job_id]
+
+def _cancel(loop: asyncio.AbstractEventLoop, task: asyncio.Task) -> None:
+    try:
+        loop.call_soon_threadsafe(task.cancel)
+    except RuntimeError:
+        pass  # the audit just finished and its loop is closed
+
+class JobManager:
+    """
+    Runs audits in the background on a bounded pool of worker threads, each audit on its own
+    event loop, so long crawls never hold the API's request threads.
+
+    With a report_store, pages go to it as they are crawled and job.result is the stored
+    summary (with its "report_id"), so a finished job holds a few KB whatever the crawl size.
+    """
+    def __init__(self, store: JobStore | None = None, max_concurrent: int = MAX_CONCURRENT_AUDITS,
+                 max_queued: int = MAX_QUEUED_JOBS, result_ttl: float = RESULT_TTL,
+                 page_store: PageStore | None = None, result_cache: AuditCache | None = None,
+                 report_store: ReportStore | None = None):
+        self.store = store or MemoryJobStore()
+        self.result_cache = result_cache
+        self.report_store = report_store
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.page_store = page_store
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="audit-job")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+        self._cancel_requested: set[str] = set()
+
+    def submit(self, params: dict) -> Job:
+        """params are run_audit's keyword arguments (url, target_keyword, max_pages, max_depth,
+        target_keywords)."""
+        self.store.purge(time.time() - self.result_ttl)
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise JobQueueFull(f"{self._queued} audits already waiting")
+            self._queued += 1
+        job = Job(id=uuid.uuid4().hex, params=params)
+        self.store.save(job)
+        self._pool.submit(self._run, job.id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        self.store.purge(time.time() - self.result_ttl)
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.store.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        with self._lock:
+            self._cancel_requested.add(job_id)
+            running = self._running.get(job_id)
+        if running:
+            _cancel(*running)
+        elif job.status == QUEUED:
+            # its worker will skip it; report it as cancelled right away
+            job.status, job.finished_at = CANCELLED, time.time()
+            self.store.save(job)
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            running = list(self._running.values())
+        for loop, task in running:
+            _cancel(loop, task)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            self._queued -= 1
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        if job_id in self._cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+
+        job.status, job.started_at = RUNNING, time.time()
+        self.store.save(job)
+        try:
+            job.result = asyncio.run(self._audit(job))
+            self._finish(job, DONE)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    async def _audit(self, job: Job) -> dict:
+        with self._lock:
+            self._running[job.id] = (asyncio.get_running_loop(), asyncio.current_task())
+            if job.id in self._cancel_requested:
+                raise asyncio.CancelledError
+        return await self._execute(job)
+
+    async def _execute(self, job: Job) -> dict:
+        """The job's work, on its own event loop. Returns: what becomes job.result."""
+        if self.result_cache is None:
+            return await self._crawl(job)
+        key = audit_key(**job.params)
+        if self.report_store:
+            # a stored summary, not a full report: never served to (or taken from) /api/audit
+            key += ("stored",)
+        return await self.result_cache.aget_or_run(key, lambda: self._crawl(job))
+
+    async def _crawl(self, job: Job) -> dict:
+        report = {}
+        with self.report_store.writer(job.id) if self.report_store else contextlib.nullcontext() as writer:
+            async for kind, item in iter_audit(**job.params, page_store=self.page_store, report_writer=writer):
+                if kind == "page":
+                    job.pages_done += 1
+                    self.store.save(job)
+                else:
+                    report = item
+        return report
+
+    def _finish(self, job: Job, status: str) -> None:
+        with self._lock:
+            self._running.pop(job.id, None)
+            self._cancel_requested.discard(job.id)
+        job.status, job.finished_at = status, time.time()
+        self.store.save(job)
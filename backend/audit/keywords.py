@@ -0,0 +1,98 @@
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+# Target keywords are counted as whole words, case-insensitively (str.casefold), by a word-level
+# Aho-Corasick automaton: one pass over a text's words finds every keyword at once, however many
+# the audit has. Punctuation between words doesn't matter, so "ship-chandler" also matches
+# "ship chandler".
+MAX_KEYWORDS = 500
+FREQUENT_KEYWORD_HITS = 20  # more than this in the page text reads as keyword stuffing
+
+_WORD = re.compile(r"\w+")
+
+def _words(text: str) -> Iterator[str]:
+    """_WORD.findall(text), faster: \\w is isalnum() plus "_", so only tokens with punctuation need the regex."""
+    for token in text.split():
+        if token.isalnum():
+            yield token
+        else:
+            yield from _WORD.findall(token)
+
+def normalize_keywords(target_keyword: str | None, target_keywords: Iterable[str] | None = None) -> tuple[str, ...]:
+    """
+    Returns: the audit's keywords in order, target_keyword first (the primary one, used for the
+    suggested title and description), whitespace collapsed, blanks and case-insensitive repeats dropped.
+    """
+    seen: set[str] = set()
+    out: list[str] = []
+    for kw in (target_keyword, *(target_keywords or ())):
+        kw = " ".join((kw or "").split())
+        if kw and kw.casefold() not in seen:
+            seen.add(kw.casefold())
+            out.append(kw)
+    return tuple(out)
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over words. States are list indices; state 0 is the root."""
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]  # keywords ending in each state, suffixes included
+        for idx, kw in enumerate(self.keywords):
+            state = 0
+            for w in _WORD.findall(kw.casefold()):
+                nxt = goto[state].get(w)
+                if nxt is None:
+                    nxt = goto[state][w] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            if state:  # a keyword without any word characters can never match
+                out[state] += (idx,)
+
+        # failure links, breadth first so every shorter suffix is linked before it's needed
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for w, t in goto[s].items():
+                queue.append(t)
+                f = fail[s]
+                while f and w not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(w, 0)
+                out[t] += out[fail[t]]
+        self._goto, self._fail, self._out = goto, fail, out
+        self._vocab = frozenset(w for edges in goto for w in edges)
+
+    def count(self, text: str | None) -> list[int]:
+        """Returns: occurrences of each keyword in text, in self.keywords order."""
+        counts = [0] * len(self.keywords)
+        goto, fail, out, vocab = self._goto, self._fail, self._out, self._vocab
+        state = 0
+        for w in _words((text or "").casefold()):
+            if w not in vocab:  # most words of a page: no keyword goes through them
+                state = 0
+                continue
+            while state and w not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(w, 0)
+            for idx in out[state]:
+                counts[idx] += 1
+        return counts
+
+    def hits(self, text: str, title: str | None, h1s: list[str]) -> dict[str, dict[str, int]]:
+        """Returns: {keyword: {"in_text", "in_title", "in_h1"}} for every keyword."""
+        in_text, in_title = self.count(text), self.count(title)
+        in_h1 = [0] * len(self.keywords)
+        for h1 in h1s:  # counted one by one: a phrase shouldn't match across two headings
+            in_h1 = [a + b for a, b in zip(in_h1, self.count(h1))]
+        return {kw: {"in_text": t, "in_title": ti, "in_h1": h}
+                for kw, t, ti, h in zip(self.keywords, in_text, in_title, in_h1)}
+
+@lru_cache(maxsize=16)
+def matcher_for(keywords: tuple[str, ...]) -> KeywordMatcher:
+    """One automaton per keyword set and process, so parse workers build it once, not once per page."""
+    return KeywordMatcher(keywords)
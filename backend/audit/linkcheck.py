@@ -0,0 +1,84 @@
+import asyncio
+import time
+import httpx
+from urllib.parse import urlparse
+
+from .transport import Transport
+
+LINK_TIMEOUT = 4
+LINK_CONCURRENCY = 8    # link checks in flight at once (still subject to the transport's limiter)
+MAX_LINK_CHECKS = 5000  # distinct URLs checked per audit; links past this are left unchecked
+
+def is_broken(status: int) -> bool:
+    return status == 0 or status >= 400
+
+async def probe(transport: Transport, url: str, method: str) -> int:
+    try:
+        async with transport.limiter.slot(url):
+            # stream + close after the headers: a GET never downloads the body
+            async with transport.client.stream(method, url, timeout=LINK_TIMEOUT) as r:
+                return r.status_code
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return 0  # unknown / failed
+
+class LinkChecker:
+    """
+    Site-wide link status cache for one audit.
+    Each URL is checked at most once however many pages link to it; concurrent requests for
+    the same URL share one check, and pages the crawler fetched are recorded instead of re-checked.
+    """
+    def __init__(self, transport: Transport, concurrency: int = LINK_CONCURRENCY, max_checks: int = MAX_LINK_CHECKS):
+        self._transport = transport
+        self._sem = asyncio.Semaphore(concurrency)
+        self._max_checks = max_checks
+        self._status: dict[str, int] = {}
+        self._seconds: dict[str, float] = {}  # time spent checking each URL (crawled pages have none)
+        self._pending: dict[str, asyncio.Task] = {}
+        self._submitted = 0
+        self._head_unreliable: set[str] = set()  # hosts where HEAD errors but GET works
+
+    def record(self, url: str, status: int) -> None:
+        self._status[url] = status
+
+    def known(self, url: str) -> bool:
+        return url in self._status or url in self._pending
+
+    def submit(self, url: str) -> None:
+        if self.known(url) or self._submitted >= self._max_checks:
+            return
+        self._submitted += 1
+        self._pending[url] = asyncio.create_task(self._check(url))
+
+    async def _check(self, url: str) -> None:
+        host = urlparse(url).netloc.lower()
+        async with self._sem:
+            t0 = time.perf_counter()
+            use_head = host not in self._head_unreliable
+            status = await probe(self._transport, url, "HEAD") if use_head else 405
+            if status >= 400:
+                status_get = await probe(self._transport, url, "GET")
+                if use_head and not is_broken(status_get):
+                    # this host answers HEAD with errors: go straight to GET from now on
+                    self._head_unreliable.add(host)
+                status = status_get
+            self._seconds[url] = time.perf_counter() - t0
+        self._status.setdefault(url, status)
+        del self._pending[url]
+
+    async def wait(self) -> None:
+        while self._pending:
+            await asyncio.gather(*self._pending.values())
+
+    def status(self, url: str) -> int | None:
+        """None when the URL was never checked (over the MAX_LINK_CHECKS budget)."""
+        return self._status.get(url)
+
+    def elapsed(self, url: str) -> float | None:
+        """Seconds the check of url took; None when it wasn't checked over the network."""
+        return self._seconds.get(url)
+
+    async def aclose(self) -> None:
+        tasks = list(self._pending.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
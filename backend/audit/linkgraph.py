@@ -0,0 +1,116 @@
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from .frontier import dedup_key
+
+# The internal link graph of a crawl. While crawling, each page's internal links are kept as
+# (source node, hash of the target's dedup key) in two flat arrays: 12 bytes a link, no strings.
+# Once the crawl is over, targets are matched to crawled pages and the graph becomes CSR arrays
+# (indptr / indices, sorted and without repeats), from which PageRank, click depth and inbound
+# link counts are computed with whole-array NumPy operations.
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-6  # L1 change between iterations
+PAGERANK_MAX_ITER = 100
+
+def _key_hash(url: str) -> int:
+    # url is canonical already (frontier URLs, normalize_url links). hash() of a str is stable
+    # within the process, and the graph never leaves it.
+    return hash(dedup_key(url))
+
+@dataclass
+class GraphStats:
+    """Per node (in LinkGraph.add_page order): inbound links from distinct crawled pages,
+    clicks from the start page (-1: unreachable) and PageRank (sums to 1)."""
+    inbound: np.ndarray
+    click_depth: np.ndarray
+    pagerank: np.ndarray
+    links: int  # distinct links between crawled pages
+
+class LinkGraph:
+    def __init__(self):
+        self._nodes = array("q")  # key hash of each crawled page
+        self._src = array("i")
+        self._dst = array("q")    # key hash of the target; matched to a node in build()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add_page(self, url: str, internal_links: list[str]) -> int:
+        """Returns: the page's node id (pages are numbered in the order they are added)."""
+        node = len(self._nodes)
+        self._nodes.append(_key_hash(url))
+        self._dst.extend(_key_hash(link) for link in internal_links)
+        self._src.extend([node] * (len(self._dst) - len(self._src)))
+        return node
+
+    def build(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns: CSR (indptr, indices) over the crawled pages; links to pages that weren't
+        crawled, self-links and repeats are dropped."""
+        n = len(self._nodes)
+        nodes = np.frombuffer(self._nodes, dtype=np.int64) if n else np.empty(0, np.int64)
+        src = np.frombuffer(self._src, dtype=np.int32) if self._src else np.empty(0, np.int32)
+        dst_hash = np.frombuffer(self._dst, dtype=np.int64) if self._dst else np.empty(0, np.int64)
+        order = np.argsort(nodes, kind="stable")
+        sorted_nodes = nodes[order]
+        pos = np.minimum(np.searchsorted(sorted_nodes, dst_hash), max(n - 1, 0))
+        hit = sorted_nodes[pos] == dst_hash if n else np.zeros(len(dst_hash), bool)
+        src, dst = src[hit].astype(np.int64), order[pos[hit]].astype(np.int64)
+        keep = src != dst
+        # one sort does it all: repeats out, edges grouped by source and ordered within it
+        # (sort + mask rather than np.unique, which is several times slower on large arrays)
+        edges = np.sort(src[keep] * n + dst[keep])
+        edges = edges[np.concatenate(([True], edges[1:] != edges[:-1]))] if len(edges) else edges
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(edges // n, minlength=n), out=indptr[1:])
+        return indptr, (edges % n).astype(np.int32)
+
+    def stats(self, start_url: str) -> GraphStats:
+        indptr, indices = self.build()
+        n = len(indptr) - 1
+        start = np.flatnonzero(np.frombuffer(self._nodes, dtype=np.int64) == _key_hash(start_url)) if n else []
+        return GraphStats(inbound=np.bincount(indices, minlength=n),
+                          click_depth=click_depth(indptr, indices, int(start[0]) if len(start) else None),
+                          pagerank=pagerank(indptr, indices), links=len(indices))
+
+def click_depth(indptr: np.ndarray, indices: np.ndarray, start: int | None) -> np.ndarray:
+    """Breadth-first search from start, one whole frontier per step. Returns: depth per node, -1 if unreachable."""
+    n = len(indptr) - 1
+    depth = np.full(n, -1, dtype=np.int32)
+    if start is None:
+        return depth
+    depth[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        starts, counts = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+        # every out-link of the frontier: each node's run of indices, concatenated
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        targets = indices[offsets]
+        level += 1
+        depth[targets[depth[targets] < 0]] = level
+        frontier = np.flatnonzero(depth == level)
+    return depth
+
+def pagerank(indptr: np.ndarray, indices: np.ndarray, damping: float = PAGERANK_DAMPING,
+             tolerance: float = PAGERANK_TOLERANCE, max_iter: int = PAGERANK_MAX_ITER) -> np.ndarray:
+    """Power iteration; pages without out-links spread their rank evenly over all pages."""
+    n = len(indptr) - 1
+    if n == 0:
+        return np.empty(0)
+    out_degree = np.diff(indptr)
+    dangling = out_degree == 0
+    share = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    targets = indices.astype(np.intp)  # what bincount works in; converted once, not every iteration
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        # float even with no edges at all, where bincount of nothing comes back as int
+        new = np.bincount(targets, weights=np.repeat(rank * share, out_degree), minlength=n).astype(float, copy=False)
+        new *= damping
+        new += (1.0 - damping + damping * rank[dangling].sum()) / n
+        delta = np.abs(new - rank).sum()
+        rank = new
+        if delta < tolerance:
+            break
+    return rank
@@ -0,0 +1,30 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from .timing import STAGES
+
+# Process-wide: every audit in this process (API requests, jobs, batch runs) reports here
+_STAGE_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+AUDITS_IN_FLIGHT = Gauge("seo_audits_in_flight", "Audits currently crawling")
+AUDITS = Counter("seo_audits_total", "Audits finished", ["outcome"])
+AUDIT_SECONDS = Histogram("seo_audit_duration_seconds", "Wall time of a whole audit",
+                          buckets=(.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+AUDIT_PAGES_PER_SECOND = Histogram("seo_audit_pages_per_second", "Crawl throughput of each audit",
+                                   buckets=(.5, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+PAGES = Counter("seo_pages_total", "Pages audited", ["source"])  # fetched / reused / failed
+BYTES_FETCHED = Counter("seo_fetched_bytes_total", "Response body bytes downloaded by page fetches")
+STAGE_SECONDS = Histogram("seo_page_stage_seconds", "Per-page time spent in each audit stage", ["stage"],
+                          buckets=_STAGE_BUCKETS)
+CACHE = Counter("seo_cache_requests_total", "Cache lookups", ["cache", "result"])
+
+# pre-create label sets so every series is exported from the first scrape
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)
+
+def observe_page(timings: dict) -> None:
+    for stage, ms in timings.items():
+        STAGE_SECONDS.labels(stage).observe(ms / 1000)
+
+def render() -> tuple[bytes, str]:
+    """Returns: (body, content type) for a /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,27 +1,85 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+import sys
+from dataclasses import dataclass, field
 
-class Issue(BaseModel):
+# Internal records are plain slotted dataclasses: cheap to build, pickle (parse workers) and
+# turn into dicts for orjson. Pydantic is only used for request bodies in app.py.
+
+@dataclass(slots=True)
+class Issue:
     priority: str  # P1/P2/P3
     code: str
     message: str
-    url: Optional[str] = None
-    details: Optional[Dict] = None
-    fix: Optional[str] = None
+    url: str | None = None
+    details: dict | None = None
+    fix: str | None = None
+
+    def to_dict(self) -> dict:
+        return {"priority": self.priority, "code": self.code, "message": self.message, "url": self.url,
+                "details": self.details, "fix": self.fix}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Issue":
+        # codes and priorities repeat on every page: share one string object each
+        return cls(sys.intern(d["priority"]), sys.intern(d["code"]), d["message"], d.get("url"),
+                   d.get("details"), d.get("fix"))
 
-class PageData(BaseModel):
+@dataclass(slots=True)
+class PageData:
     url: str
     status: int
+    content_type: str | None = None  # media type of the response; only HTML is analyzed
     title: str | None = None
     meta_description: str | None = None
-    h1: List[str] = []
-    headings: Dict[str, int] = {}
+    h1: list[str] = field(default_factory=list)
+    headings: dict[str, int] = field(default_factory=dict)
     images_total: int = 0
     images_missing_alt: int = 0
     internal_links: int = 0
     external_links: int = 0
     word_count: int = 0
-    keyword_hits: Dict[str, int] = {}
-    issues: List[Issue] = []
-    suggestions: Dict[str, str] = {}
-    speed_tips: List[str] = []
\ No newline at end of file
+    keyword_hits: dict[str, dict[str, int]] = field(default_factory=dict)  # keyword -> in_text / in_title / in_h1
+    issues: list[Issue] = field(default_factory=list)
+    suggestions: dict[str, str] = field(default_factory=dict)
+    speed_tips: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)  # stage -> milliseconds, see audit/timing.py
+    content_fingerprint: str | None = None  # MinHash of the visible text, see audit/neardup.py
+    # from the internal link graph (audit/linkgraph.py), set once the crawl is over
+    inbound_links: int | None = None  # crawled pages linking here
+    click_depth: int | None = None    # clicks from the start page; None if no crawled path leads here
+    pagerank: float | None = None     # internal PageRank, scaled so the average page scores 1.0
+
+    def to_dict(self, internal: bool = False) -> dict:
+        """The page as the API shows it. internal adds what only the audit itself uses (the page store)."""
+        d = {
+            "url": self.url,
+            "status": self.status,
+            "content_type": self.content_type,
+            "title": self.title,
+            "meta_description": self.meta_description,
+            "h1": self.h1,
+            "headings": self.headings,
+            "images_total": self.images_total,
+            "images_missing_alt": self.images_missing_alt,
+            "internal_links": self.internal_links,
+            "external_links": self.external_links,
+            "word_count": self.word_count,
+            "keyword_hits": self.keyword_hits,
+            "issues": [i.to_dict() for i in self.issues],
+            "suggestions": self.suggestions,
+            "speed_tips": self.speed_tips,
+            "timings": self.timings,
+            "inbound_links": self.inbound_links,
+            "click_depth": self.click_depth,
+            "pagerank": self.pagerank,
+        }
+        if internal:
+            d["content_fingerprint"] = self.content_fingerprint
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PageData":
+        d = {k: v for k, v in d.items() if k in _PAGE_FIELDS}
+        d["issues"] = [Issue.from_dict(i) for i in d.get("issues", [])]
+        return cls(**d)
+
+_PAGE_FIELDS = frozenset(PageData.__dataclass_fields__)
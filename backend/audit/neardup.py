@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+
+import numpy as np
+
+# Near-duplicate detection in roughly linear time: MinHash signatures are bucketed by LSH bands
+# (16 bands x 4 rows) and only texts sharing a bucket are compared, never all pairs.
+#
+# Page text: word 3-shingles. The signature is computed where the page is parsed and kept on
+# PageData as 64 one-byte minhashes (base64), so reused pages don't need their text again.
+# Titles / descriptions: their word sets, hashed at report time and confirmed on exact Jaccard.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+WORD_SHINGLE = 3
+MIN_TEXT_WORDS = 50           # thinner pages all look alike; THIN_CONTENT covers them
+CONTENT_SIMILARITY = 0.8      # Jaccard similarity of the shingle sets
+SHORT_TEXT_SIMILARITY = 0.8   # Jaccard similarity of the word sets
+MINHASH_CHUNK = 2048          # texts per batch when computing signatures (bounds the temp arrays)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Permutations as multiply-add over 64-bit token hashes (uint64 math wraps); the high bits of the
+# result are the well-mixed ones. Fixed seed: signatures must not change between runs or processes.
+_PERM_MUL, _PERM_ADD = np.random.default_rng(2024).integers(0, 1 << 64, size=(2, MINHASH_PERMUTATIONS, 1),
+                                                            dtype=np.uint64)
+_PERM_MUL |= np.uint64(1)
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SHINGLE_MIX = np.array([0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x9E3779B97F4A7C15], dtype=np.uint64)
+
+def _hash64(token: str) -> int:
+    # stable across processes (parse workers), unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+def words(text: str | None) -> list[str]:
+    return _WORD.findall((text or "").lower())
+
+def _minhash(x: np.ndarray) -> np.ndarray:
+    """Returns: the minimum of each permutation over the token hashes x."""
+    permuted = np.multiply(x, _PERM_MUL)
+    permuted += _PERM_ADD
+    return permuted.min(axis=1)
+
+def minhash_signatures(token_sets: list[frozenset[str]]) -> np.ndarray:
+    """Returns: (len(token_sets), MINHASH_PERMUTATIONS) uint64 signatures; every set must be non-empty."""
+    vocab: dict[str, int] = {}
+    ids = np.fromiter((vocab.setdefault(t, len(vocab)) for ts in token_sets for t in ts), dtype=np.intp)
+    hashes = np.fromiter((_hash64(t) for t in vocab), dtype=np.uint64, count=len(vocab))[ids]
+    sizes = np.fromiter((len(ts) for ts in token_sets), dtype=np.intp, count=len(token_sets))
+    bounds = np.concatenate(([0], np.cumsum(sizes)))
+    out = np.empty((len(token_sets), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    for lo in range(0, len(token_sets), MINHASH_CHUNK):
+        hi = min(lo + MINHASH_CHUNK, len(token_sets))
+        permuted = np.multiply(hashes[bounds[lo]:bounds[hi]], _PERM_MUL)
+        permuted += _PERM_ADD
+        out[lo:hi] = np.minimum.reduceat(permuted, bounds[lo:hi] - bounds[lo], axis=1).T
+    return out
+
+def text_fingerprint(text: str) -> str | None:
+    """MinHash of the page text's word shingles, one byte of each minhash, base64; None for thin pages."""
+    ws = text.lower().split()  # cheaper than words(): pages are long, and this runs on every one
+    if len(ws) < MIN_TEXT_WORDS:
+        return None
+    # hash each distinct word once, then mix neighbours into shingle hashes without building the strings
+    vocab: dict[str, int] = {}
+    ids = [vocab.setdefault(w, len(vocab)) for w in ws]
+    wh = np.fromiter((zlib.crc32(w.encode("utf-8", "surrogatepass")) for w in vocab), dtype=np.uint64,
+                     count=len(vocab))[ids]
+    n = len(ws) - WORD_SHINGLE + 1
+    shingles = np.zeros(n, dtype=np.uint64)
+    for k in range(WORD_SHINGLE):
+        shingles = (shingles ^ wh[k:k + n]) * _SHINGLE_MIX[k]
+    # repeated shingles can't change a minimum, so no np.unique (its sort cost more than the minhash);
+    # the minima are small numbers: remix them before keeping one byte
+    sig = ((_minhash(shingles) * _BAND_MIX) >> np.uint64(56)).astype(np.uint8)
+    return base64.b64encode(sig.tobytes()).decode()
+
+class _DisjointSet:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+def _band_keys(sigs: np.ndarray) -> np.ndarray:
+    """Folds each band's rows into one 64-bit key; a rare collision only costs an extra comparison."""
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    sigs = sigs.astype(np.uint64).reshape(len(sigs), MINHASH_BANDS, rows)
+    keys = np.zeros((len(sigs), MINHASH_BANDS), dtype=np.uint64)
+    for r in range(rows):
+        keys = keys * _BAND_MIX ^ sigs[:, :, r]
+    return keys
+
+def _shared_buckets(band_keys: np.ndarray) -> Iterator[list[int]]:
+    """Yields the row indices of each run of 2+ equal values in a column of band keys."""
+    order = np.argsort(band_keys, kind="stable")
+    ordered = band_keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    ends = np.append(starts[1:], len(ordered))
+    shared = ends - starts > 1
+    for lo, hi in zip(starts[shared].tolist(), ends[shared].tolist()):
+        yield order[lo:hi].tolist()
+
+def _cluster(items: list[tuple[str, object]], keys: list, by_key: dict, sigs: np.ndarray,
+             similar: Callable[[int, np.ndarray], np.ndarray]) -> list[list[str]]:
+    """
+    In each shared bucket, unions the keys that pass similar(first member, others) with the first
+    member, then expands keys back to item ids. Only the first member is compared against, so a
+    bucket costs O(its size) even on templated sites where thousands of pages share one; pairs it
+    misses are nearly always caught through another band. Returns: groups of 2+ ids, each in
+    input order.
+    """
+    ds = _DisjointSet(len(keys))
+    bands = _band_keys(sigs)
+    for band in range(MINHASH_BANDS if len(keys) else 0):
+        for rep, *others in _shared_buckets(bands[:, band]):
+            root = ds.find(rep)
+            others = np.array([b for b in others if ds.find(b) != root], dtype=np.intp)
+            if others.size:
+                for b in others[similar(rep, others)].tolist():
+                    ds.union(rep, b)
+
+    groups: dict[int, list[str]] = defaultdict(list)
+    for idx, key in enumerate(keys):
+        groups[ds.find(idx)].extend(by_key[key])
+    order = {item_id: n for n, (item_id, _) in enumerate(items)}
+    return [sorted(ids, key=order.__getitem__) for ids in groups.values() if len(ids) > 1]
+
+def similar_fingerprints(items: list[tuple[str, str]], threshold: float = CONTENT_SIMILARITY) -> list[list[str]]:
+    """
+    items are (id, text_fingerprint). Returns: groups of 2+ ids whose estimated Jaccard similarity
+    chains together at >= threshold.
+    """
+    by_key: dict[str, list[str]] = defaultdict(list)
+    for item_id, fp in items:
+        by_key[fp].append(item_id)  # identical fingerprints are merged up front
+    keys = list(by_key)
+    sigs = np.frombuffer(b"".join(base64.b64decode(k) for k in keys), dtype=np.uint8).reshape(-1, MINHASH_PERMUTATIONS)
+    # one-byte minhashes of different shingles still agree 1 time in 256: correct for it
+    floor = 1 / 256
+    return _cluster(items, keys, by_key, sigs,
+                    lambda a, bs: ((sigs[bs] == sigs[a]).mean(axis=1) - floor) / (1 - floor) >= threshold)
+
+def similar_texts(items: list[tuple[str, str]], threshold: float = SHORT_TEXT_SIMILARITY) -> list[list[str]]:
+    """
+    items are (id, short text). Returns: groups of 2+ ids whose texts' word sets chain together
+    at Jaccard similarity >= threshold. Texts with no words are skipped.
+    """
+    by_key: dict[frozenset, list[str]] = defaultdict(list)
+    for item_id, text in items:
+        tokens = frozenset(words(text))
+        if tokens:
+            by_key[tokens].append(item_id)
+    keys = list(by_key)
+    sigs = minhash_signatures(keys)
+    return _cluster(items, keys, by_key, sigs,
+                    lambda a, bs: np.array([len(keys[a] & keys[b]) / len(keys[a] | keys[b]) >= threshold
+                                            for b in bs.tolist()], dtype=bool))
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import orjson
+from dataclasses import dataclass
+
+from .models import PageData
+
+COMMIT_EVERY = 50  # buffered writes per transaction
+ANALYSIS_VERSION = 4  # bump when analyze_page's output changes, so stored analyses are redone
+# Each (home, keywords) combination keeps its own copy of a page, so the store is bounded: pages
+# not fetched or revalidated for PAGE_TTL go, and past MAX_PAGES rows the least recently
+# fetched go first. Checked when the store opens and then on flush(), at most every PURGE_INTERVAL.
+PAGE_TTL = int(os.getenv("PAGE_CACHE_TTL", 30 * 86400))
+MAX_PAGES = int(os.getenv("PAGE_CACHE_MAX_PAGES", 500_000))
+PURGE_INTERVAL = 600  # seconds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url           TEXT NOT NULL,
+    params        TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT NOT NULL,
+    page          TEXT NOT NULL,
+    links         TEXT NOT NULL,
+    fetched_at    REAL NOT NULL,
+    PRIMARY KEY (url, params)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+"""
+
+def content_hash(html: str) -> str:
+    return hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+def analysis_key(home: str, keywords: tuple[str, ...]) -> str:
+    """
+    analyze_page's output depends on more than the page body (internal vs external links,
+    keyword checks), so a cached analysis is only valid for the same inputs.
+    """
+    raw = json.dumps([ANALYSIS_VERSION, home, list(keywords)])
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+@dataclass
+class CachedPage:
+    status: int
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+    page: PageData
+    links: list[str]
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class PageStore:
+    """
+    On-disk cache of analyzed pages, keyed by URL, shared across audits.
+    Re-audits send its validators as conditional requests and reuse the stored PageData
+    when the server answers 304 or the body hashes the same.
+    """
+    def __init__(self, path: str, ttl: float = PAGE_TTL, max_pages: int = MAX_PAGES):
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._dirty = 0
+        self._purged_at = 0.0
+        self.purge()
+
+    def get(self, url: str, params: str) -> CachedPage | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, etag, last_modified, content_hash, page, links FROM pages WHERE url=? AND params=?",
+                (url, params),
+            ).fetchone()
+        if row is None:
+            return None
+        status, etag, last_modified, chash, page, links = row
+        return CachedPage(status, etag, last_modified, chash, PageData.from_dict(orjson.loads(page)), orjson.loads(links))
+
+    def put(self, url: str, params: str, status: int, etag: str | None, last_modified: str | None,
+            chash: str, page: PageData, links: list[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, params, status, etag, last_modified, chash, orjson.dumps(page.to_dict(internal=True)).decode(), orjson.dumps(links).decode(), time.time()),
+            )
+            self._dirty += 1
+            if self._dirty >= COMMIT_EVERY:
+                self._conn.commit()
+                self._dirty = 0
+
+    def revalidated(self, url: str, params: str, etag: str | None, last_modified: str | None) -> None:
+        """The server confirmed the stored copy: refresh its validators and timestamp."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET etag=COALESCE(?, etag), last_modified=COALESCE(?, last_modified), fetched_at=? "
+                "WHERE url=? AND params=?",
+                (etag, last_modified, time.time(), url, params),
+            )
+            self._dirty += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._dirty = 0
+        if time.monotonic() - self._purged_at >= PURGE_INTERVAL:
+            self.purge()
+
+    def purge(self) -> int:
+        """Drops pages past the TTL, then the least recently fetched past max_pages. Returns: pages dropped."""
+        with self._lock:
+            self._purged_at = time.monotonic()
+            dropped = self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,)).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] - self.max_pages
+            if excess > 0:
+                dropped += self._conn.execute(
+                    "DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY fetched_at LIMIT ?)",
+                    (excess,)).rowcount
+            self._conn.commit()
+            self._dirty = 0
+            return dropped
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -1,66 +1,200 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import orjson
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
 
-def build_pdf(report: dict) -> bytes:
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    w, h = A4
+from .reportstore import PRIORITIES, ReportStore
+
+PDF_WORKERS = 2
+PDF_CACHE_MAX_BYTES = 512 << 20
+CHUNK_SIZE = 64 << 10  # bytes per chunk when streaming a rendered file
+
+MARGIN = 2 * cm
+LINE = 0.42 * cm
+
+class _Writer:
+    """Canvas wrapper that wraps long lines and starts a new PDF page whenever one fills up."""
+    def __init__(self, out):
+        # invariant: identical reports render to identical bytes (no timestamps / random ids)
+        self.c = canvas.Canvas(out, pagesize=A4, pageCompression=1, invariant=1)
+        self.w, self.h = A4
+        self.y = self.h - MARGIN
+
+    def line(self, s: str, size: int = 10, bold: bool = False, indent: float = 0, step: float = LINE):
+        font = "Helvetica-Bold" if bold else "Helvetica"
+        x = MARGIN + indent
+        for part in simpleSplit(s, font, size, self.w - MARGIN - x) or [""]:
+            if self.y < MARGIN:
+                self.c.showPage()
+                self.y = self.h - MARGIN
+            self.c.setFont(font, size)
+            self.c.drawString(x, self.y, part)
+            self.y -= step
+
+    def gap(self, dy: float):
+        self.y -= dy
 
-    def text(x, y, s, size=11):
-        c.setFont("Helvetica", size)
-        c.drawString(x, y, s[:140])
+    def save(self):
+        self.c.save()
 
-    y = h - 2 * cm
-    text(2*cm, y, "SEO Quick Audit Report", 18); y -= 1.0*cm
-    text(2*cm, y, f"Site: {report.get('site', {}).get('url','')}", 12); y -= 0.7*cm
-    kw = report.get("inputs", {}).get("target_keyword")
-    if kw:
-        text(2*cm, y, f"Target keyword: {kw}", 12); y -= 0.7*cm
+def render_pdf(out, site: dict, inputs: dict, priority_fixes: dict[str, Iterable[dict]],
+               pages: Iterable[dict], counts: dict[str, int] | None = None) -> None:
+    """
+    Writes the full report to `out` (path or binary file). Issues and pages are consumed one at a
+    time, so callers can pass generators and memory stays flat however large the report is.
+    counts gives each priority's total when priority_fixes holds iterators rather than lists.
+    """
+    doc = _Writer(out)
+    doc.line("SEO Quick Audit Report", 18, step=1.0*cm)
+    doc.line(f"Site: {site.get('url','')}", 12, step=0.7*cm)
+    kws = inputs.get("target_keywords") or ([inputs["target_keyword"]] if inputs.get("target_keyword") else [])
+    if len(kws) == 1:
+        doc.line(f"Target keyword: {kws[0]}", 12, step=0.7*cm)
+    elif kws:
+        more = f" (+{len(kws) - 10} more)" if len(kws) > 10 else ""
+        doc.line(f"Target keywords: {', '.join(kws[:10])}{more}", 12, step=0.7*cm)
 
     def section(title):
-        nonlocal y
-        y -= 0.5*cm
-        c.setFont("Helvetica-Bold", 13)
-        c.drawString(2*cm, y, title)
-        y -= 0.6*cm
-        c.setFont("Helvetica", 11)
+        doc.gap(0.5*cm)
+        doc.line(title, 13, bold=True, step=0.6*cm)
 
     section("Priority Fix List")
-    pf = report.get("priority_fixes", {})
     for pr in ("P1", "P2", "P3"):
-        issues = pf.get(pr, [])
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(2*cm, y, f"{pr} ({len(issues)})"); y -= 0.5*cm
-        c.setFont("Helvetica", 10)
-        for i, it in enumerate(issues[:20], start=1):
-            line = f"{i}. {it.get('message','')}  [{it.get('url','')}]"
-            c.drawString(2*cm, y, line[:160]); y -= 0.42*cm
+        issues = priority_fixes.get(pr, [])
+        total = counts[pr] if counts else len(issues)
+        doc.line(f"{pr} ({total})", 12, bold=True, step=0.5*cm)
+        for i, it in enumerate(issues, start=1):
+            doc.line(f"{i}. {it.get('message','')}  [{it.get('url','')}]")
             fix = it.get("fix")
             if fix:
-                c.drawString(2.5*cm, y, f"Fix: {fix}"[:160]); y -= 0.42*cm
-            if y < 2*cm:
-                c.showPage()
-                y = h - 2*cm
+                doc.line(f"Fix: {fix}", indent=0.5*cm)
 
-    section("Per-Page Suggestions (Top 10)")
-    pages = report.get("pages", [])[:10]
+    section("Per-Page Suggestions")
     for p in pages:
-        url = p.get("url","")
         st = p.get("suggestions", {}).get("suggested_title")
         sd = p.get("suggestions", {}).get("suggested_meta_description")
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(2*cm, y, url[:160]); y -= 0.42*cm
-        c.setFont("Helvetica", 10)
+        doc.line(p.get("url",""), bold=True)
         if st:
-            c.drawString(2.5*cm, y, f"Title: {st}"[:160]); y -= 0.42*cm
+            doc.line(f"Title: {st}", indent=0.5*cm)
         if sd:
-            c.drawString(2.5*cm, y, f"Desc: {sd}"[:160]); y -= 0.42*cm
-        y -= 0.2*cm
-        if y < 2*cm:
-            c.showPage()
-            y = h - 2*cm
-
-    c.save()
-    return buf.getvalue()
\ No newline at end of file
+            doc.line(f"Desc: {sd}", indent=0.5*cm)
+        doc.gap(0.2*cm)
+
+    doc.save()
+
+def _render_report(report: dict, out) -> None:
+    render_pdf(out, report.get("site", {}), report.get("inputs", {}), report.get("priority_fixes", {}),
+               report.get("pages", []))
+
+def _render_stored(store_path: str, report_id: str, out) -> None:
+    # straight from the report store's rows: nothing but the summary is loaded whole
+    store = ReportStore(store_path)
+    try:
+        summary = store.summary(report_id)
+        if summary is None:
+            raise KeyError(report_id)
+        render_pdf(out, summary["site"], summary["inputs"],
+                   {pr: store.iter_issues(report_id, pr) for pr in PRIORITIES},
+                   store.iter_pages(report_id), counts=summary["counts"]["issues"])
+    finally:
+        store.close()
+
+def build_pdf(report: dict) -> bytes:
+    buf = BytesIO()
+    _render_report(report, buf)
+    return buf.getvalue()
+
+def report_hash(report: dict) -> str:
+    return hashlib.sha256(orjson.dumps(report, default=str, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def _render_to_file(path: str, render, *args) -> None:
+    # runs in a worker process: write next to the final path, then move it into place atomically
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            render(*args, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def iter_file(path: str, chunk_size: int = CHUNK_SIZE):
+    """Opens the file now (so later cache eviction can't pull it away) and yields it in chunks."""
+    f = open(path, "rb")
+
+    def chunks():
+        with f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    return chunks()
+
+class PdfRenderer:
+    """
+    Renders reports to PDF in worker processes and keeps the files on disk keyed by the report's
+    content hash, so downloading the same report again is a file read.
+    """
+    def __init__(self, cache_dir: str, workers: int = PDF_WORKERS, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def cached(self, key: str) -> str | None:
+        path = self.path_for(key)
+        if os.path.exists(path):
+            os.utime(path)  # LRU by mtime
+            return path
+        return None
+
+    async def render(self, report: dict, key: str | None = None) -> str:
+        """Returns: path of the rendered PDF (rendered now or found in the cache)."""
+        loop = asyncio.get_running_loop()
+        if key is None:
+            key = await loop.run_in_executor(None, report_hash, report)
+        return await self._render(key, _render_report, report)
+
+    async def render_stored(self, store_path: str, report_id: str) -> str:
+        """Same as render(), for a finished report in a ReportStore. A stored report never changes,
+        so its id is the cache key."""
+        return await self._render(f"report-{report_id}", _render_stored, store_path, report_id)
+
+    async def _render(self, key: str, render, *args) -> str:
+        path = self.cached(key)
+        if path:
+            return path
+        path = self.path_for(key)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool, _render_to_file, path, render, *args)
+        await loop.run_in_executor(None, self._evict)
+        return path
+
+    def _evict(self) -> None:
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pdf"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _mtime, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,11 @@
+from collections import defaultdict
+
+from .content import is_html
 from .models import Issue
+from .neardup import similar_fingerprints, similar_texts
+
+WEAK_INBOUND_LINKS = 1  # pages with this many linking pages or fewer are weakly linked
+MAX_CLICK_DEPTH = 3     # deeper than this many clicks from the homepage
 
 def classify_issues(page) -> list[Issue]:
     issues: list[Issue] = []
@@ -36,4 +43,79 @@ def classify_issues(page) -> list[Issue]:
                             message=f"Low visible word count (~{page.word_count}).", url=page.url,
                             fix="Add useful content: services, FAQs, proof, process, and location/service details."))
 
-    return issues
\ No newline at end of file
+    return issues
+
+def link_issues(page, complete: bool) -> list[Issue]:
+    """
+    Issues from a page's place in the internal link graph (inbound_links / click_depth set).
+    Inbound counts only see crawled pages, so orphans and weak linking are only reported when
+    complete: the crawl reached every internal page it found a link to.
+    """
+    issues: list[Issue] = []
+    if not (0 < page.status < 400 and is_html(page.content_type)) or page.click_depth == 0:
+        return issues
+
+    if complete and page.inbound_links == 0:
+        issues.append(Issue(priority="P2", code="ORPHAN_PAGE", message="No internal links point to this page.",
+                            url=page.url, details={"inbound_links": 0},
+                            fix="Link to it from a related page or the navigation, or remove it from the sitemap if it is obsolete."))
+    elif complete and page.inbound_links <= WEAK_INBOUND_LINKS:
+        issues.append(Issue(priority="P3", code="WEAKLY_LINKED",
+                            message=f"Only {page.inbound_links} internal page links here.", url=page.url,
+                            details={"inbound_links": page.inbound_links},
+                            fix="Link to it from more related pages (hubs, related content, breadcrumbs) so users and crawlers find it."))
+    if page.click_depth is not None and page.click_depth > MAX_CLICK_DEPTH:
+        issues.append(Issue(priority="P3", code="DEEP_PAGE",
+                            message=f"Page is {page.click_depth} clicks from the homepage.", url=page.url,
+                            details={"click_depth": page.click_depth},
+                            fix=f"Link to it from a page closer to the homepage, so it is at most {MAX_CLICK_DEPTH} clicks away."))
+    return issues
+
+def _near_duplicate_groups(pages, field: str) -> list[list[str]]:
+    """Groups of URLs with near-identical titles / descriptions, minus groups that are all one exact text."""
+    text = {p.url: getattr(p, field) for p in pages if getattr(p, field)}
+    groups = similar_texts(list(text.items()))
+    return [g for g in groups if len({text[u].strip().lower() for u in g}) > 1]
+
+def duplicate_issues(pages) -> list[Issue]:
+    """Site-wide issues: exact duplicate titles / descriptions per page, one issue per near-duplicate group."""
+    issues: list[Issue] = []
+
+    titles_map = defaultdict(list)
+    desc_map = defaultdict(list)
+    for page in pages:
+        if page.title:
+            titles_map[page.title.strip().lower()].append(page.url)
+        if page.meta_description:
+            desc_map[page.meta_description.strip().lower()].append(page.url)
+
+    for urls in titles_map.values():
+        if len(urls) >= 2:
+            for u in urls:
+                issues.append(Issue(priority="P2", code="DUPLICATE_TITLE",
+                                    message=f"Duplicate title used on {len(urls)} pages.", url=u,
+                                    fix="Make each page title unique and specific to that page."))
+    for urls in desc_map.values():
+        if len(urls) >= 2:
+            for u in urls:
+                issues.append(Issue(priority="P3", code="DUPLICATE_META_DESCRIPTION",
+                                    message=f"Duplicate meta description used on {len(urls)} pages.", url=u,
+                                    fix="Write a unique description for each page that summarizes its own content."))
+
+    content = {p.url: p.content_fingerprint for p in pages if p.content_fingerprint}
+    for urls in similar_fingerprints(list(content.items())):
+        issues.append(Issue(priority="P2", code="NEAR_DUPLICATE_CONTENT",
+                            message=f"{len(urls)} pages have nearly identical content.", url=urls[0],
+                            details={"pages": urls[:50]},
+                            fix="Merge near-duplicate pages (301 or rel=canonical to the main one) or make each page's content distinct."))
+    for urls in _near_duplicate_groups(pages, "title"):
+        issues.append(Issue(priority="P3", code="NEAR_DUPLICATE_TITLE",
+                            message=f"{len(urls)} pages have near-identical titles.", url=urls[0],
+                            details={"pages": urls[:50]},
+                            fix="Differentiate the titles so each one names what is specific to its page."))
+    for urls in _near_duplicate_groups(pages, "meta_description"):
+        issues.append(Issue(priority="P3", code="NEAR_DUPLICATE_META_DESCRIPTION",
+                            message=f"{len(urls)} pages have near-identical meta descriptions.", url=urls[0],
+                            details={"pages": urls[:50]},
+                            fix="Rewrite the descriptions so each one summarizes its own page."))
+    return issues
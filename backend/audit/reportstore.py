@@ -0,0 +1,329 @@
+import sqlite3
+import threading
+import time
+import orjson
+from collections.abc import Iterator
+from contextlib import closing
+
+from .models import Issue, PageData
+
+# Finished reports on disk, one row per page, issue and broken link, so the API can page through a
+# 50k-page report and the crawl can hand pages off as it goes instead of holding them all.
+# Rows are ordered by rank: a page's (depth, frontier seq) packed into one integer, which is the
+# report's BFS order; site-wide issues (duplicates, broken links) come after every page's.
+# Every filter has an index that ends in the sort order, so a page of results is an index range
+# scan; the JSON rows are only read for the rows returned.
+COMMIT_EVERY = 200       # buffered row writes per transaction
+REPORT_TTL = 7 * 86400   # seconds a finished report is kept
+PAGE_LIMIT = 50          # default rows per query
+MAX_PAGE_LIMIT = 500
+JSON_BATCH = 500         # rows per chunk when streaming a whole report as JSON
+
+SITE_RANK = 1 << 62
+LATE_ISSUE = 1 << 20  # n of an issue added to a page after it was written: after the page's own
+PRIORITIES = ("P1", "P2", "P3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id          TEXT PRIMARY KEY,
+    created_at  REAL NOT NULL,
+    finished_at REAL,
+    summary     TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    report_id TEXT NOT NULL,
+    rank      INTEGER NOT NULL,
+    url       TEXT NOT NULL,
+    status    INTEGER NOT NULL,
+    page      TEXT NOT NULL,
+    UNIQUE (report_id, rank)
+);
+CREATE INDEX IF NOT EXISTS pages_url ON pages (report_id, url, rank);
+CREATE INDEX IF NOT EXISTS pages_status ON pages (report_id, status, rank);
+CREATE TABLE IF NOT EXISTS issues (
+    report_id TEXT NOT NULL,
+    rank      INTEGER NOT NULL,
+    n         INTEGER NOT NULL,
+    priority  TEXT NOT NULL,
+    code      TEXT NOT NULL,
+    url       TEXT,
+    issue     TEXT NOT NULL,
+    UNIQUE (report_id, rank, n)
+);
+CREATE INDEX IF NOT EXISTS issues_priority ON issues (report_id, priority, rank, n);
+CREATE INDEX IF NOT EXISTS issues_code ON issues (report_id, code, rank, n);
+CREATE INDEX IF NOT EXISTS issues_url ON issues (report_id, url, rank, n);
+CREATE TABLE IF NOT EXISTS broken_links (
+    report_id TEXT NOT NULL,
+    n         INTEGER NOT NULL,
+    source    TEXT NOT NULL,
+    target    TEXT NOT NULL,
+    status    INTEGER NOT NULL,
+    UNIQUE (report_id, n)
+);
+CREATE INDEX IF NOT EXISTS broken_links_source ON broken_links (report_id, source, n);
+"""
+
+_TABLES = ("pages", "issues", "broken_links")
+
+def page_rank(depth: int, seq: int) -> int:
+    return depth << 40 | seq
+
+def _where(report_id: str, filters: dict) -> tuple[str, list]:
+    """filters: {sql condition: value}, None values skipped. A condition with more than one ? takes a tuple."""
+    conds, args = ["report_id = ?"], [report_id]
+    for cond, value in filters.items():
+        if value is not None:
+            conds.append(cond)
+            args.extend(value if isinstance(value, tuple) else (value,))
+    return " AND ".join(conds), args
+
+def _json_array(rows: Iterator[tuple]) -> Iterator[bytes]:
+    """The JSON texts in the first column of rows, as the chunks of one JSON array."""
+    yield b"["
+    batch: list[str] = []
+    sep = ""
+    for (text,) in rows:
+        batch.append(text)
+        if len(batch) >= JSON_BATCH:
+            yield (sep + ",".join(batch)).encode()
+            batch, sep = [], ","
+    if batch:
+        yield (sep + ",".join(batch)).encode()
+    yield b"]"
+
+class ReportWriter:
+    """
+    Writes one audit's report while it runs: add_page() as pages finish (in any order), then
+    update_pages() and add_broken_links() in batches once the link checks are in, then finish()
+    with the site-wide part. Used as a context manager: a report that never reached finish()
+    (the crawl failed or was cancelled) is deleted on exit.
+    """
+    def __init__(self, store: "ReportStore", report_id: str):
+        self.store = store
+        self.report_id = report_id
+        self.finished = False
+        self._broken = 0  # broken links written so far
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.finished:
+            self.store.delete(self.report_id)
+
+    def add_page(self, rank: int, page: PageData) -> None:
+        rid = self.report_id
+        issues = [(rid, rank, n, i.priority, i.code, i.url, orjson.dumps(i.to_dict()).decode())
+                  for n, i in enumerate(page.issues)]
+        self.store._write(
+            [("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+              [(rid, rank, page.url, page.status, orjson.dumps(page.to_dict()).decode())]),
+             ("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)", issues)])
+
+    def update_pages(self, patches: dict[int, dict], issues: dict[int, list[Issue]]) -> None:
+        """
+        What is only known once the crawl is over (link_check times, link graph numbers):
+        patches {rank: partial page dict} are merged into the stored pages, and issues {rank: [...]}
+        appended to them.
+        """
+        rid = self.report_id
+        added = [(rank, n, i, orjson.dumps(i.to_dict()).decode())
+                 for rank, page_issues in issues.items() for n, i in enumerate(page_issues, LATE_ISSUE)]
+        self.store._write([
+            ("UPDATE pages SET page = json_patch(page, ?) WHERE report_id = ? AND rank = ?",
+             # a null in a merge patch deletes the key; the stored page already has it as null
+             [(orjson.dumps({k: v for k, v in patch.items() if v is not None}).decode(), rid, rank)
+              for rank, patch in patches.items()]),
+            ("UPDATE pages SET page = json_insert(page, '$.issues[#]', json(?)) WHERE report_id = ? AND rank = ?",
+             [(issue, rid, rank) for rank, _n, _i, issue in added]),
+            ("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)",
+             [(rid, rank, n, i.priority, i.code, i.url, issue) for rank, n, i, issue in added]),
+        ])
+
+    def add_broken_links(self, broken_links: list[dict]) -> None:
+        """{"from", "to", "status"} dicts, appended in order."""
+        rid, start = self.report_id, self._broken
+        self._broken += len(broken_links)
+        self.store._write([("INSERT OR REPLACE INTO broken_links VALUES (?, ?, ?, ?, ?)",
+                            [(rid, n, b["from"], b["to"], b["status"]) for n, b in enumerate(broken_links, start)])])
+
+    def finish(self, report: dict) -> dict:
+        """
+        report is build_report's output without pages; its priority_fixes hold only the
+        site-wide issues. Returns: the stored summary (see ReportStore.summary).
+        """
+        rid = self.report_id
+        site_issues = [(rid, SITE_RANK, n, i["priority"], i["code"], i.get("url"), orjson.dumps(i).decode())
+                       for n, i in enumerate(i for pr in PRIORITIES for i in report["priority_fixes"].get(pr, []))]
+        self.store._write([("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)", site_issues)])
+        summary = {k: v for k, v in report.items() if k not in ("priority_fixes", "pages", "broken_links")}
+        summary["report_id"] = rid
+        summary["counts"] = self.store._counts(rid)
+        self.store._write([("UPDATE reports SET finished_at = ?, summary = ? WHERE id = ?",
+                            [(time.time(), orjson.dumps(summary).decode(), rid)])], commit=True)
+        self.finished = True
+        return summary
+
+class ReportStore:
+    """
+    SQLite store of audit reports. Writes go through one connection under a lock (WAL, batched
+    commits); reads open their own connection, so long streams don't hold up the writers.
+    summary() only returns finished reports: check it before reading the rest.
+    """
+    def __init__(self, path: str, ttl: float = REPORT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._dirty = 0
+
+    def writer(self, report_id: str) -> ReportWriter:
+        self.purge(time.time() - self.ttl)
+        self._write([("INSERT OR REPLACE INTO reports (id, created_at) VALUES (?, ?)", [(report_id, time.time())])],
+                    commit=True)
+        return ReportWriter(self, report_id)
+
+    def _write(self, statements: list[tuple[str, list[tuple]]], commit: bool = False) -> None:
+        with self._lock:
+            for sql, rows in statements:
+                if rows:
+                    self._conn.executemany(sql, rows)
+                    self._dirty += len(rows)
+            if commit or self._dirty >= COMMIT_EVERY:
+                self._conn.commit()
+                self._dirty = 0
+
+    def _read(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _counts(self, report_id: str) -> dict:
+        self._write([], commit=True)
+        with self._lock:
+            q = self._conn.execute
+            by_priority = dict(q("SELECT priority, COUNT(*) FROM issues WHERE report_id = ? GROUP BY priority",
+                                 (report_id,)).fetchall())
+            by_code = dict(q("SELECT code, COUNT(*) FROM issues WHERE report_id = ? GROUP BY code ORDER BY 2 DESC",
+                             (report_id,)).fetchall())
+            pages = q("SELECT COUNT(*) FROM pages WHERE report_id = ?", (report_id,)).fetchone()[0]
+            links = q("SELECT COUNT(*) FROM broken_links WHERE report_id = ?", (report_id,)).fetchone()[0]
+        return {"pages": pages, "issues": {pr: by_priority.get(pr, 0) for pr in PRIORITIES},
+                "issue_codes": by_code, "broken_links": links}
+
+    def summary(self, report_id: str) -> dict | None:
+        """Returns: the report without its pages, issues and broken links, plus "report_id" and
+        "counts" ({"pages", "issues": {P1, P2, P3}, "issue_codes", "broken_links"})."""
+        with closing(self._read()) as conn:
+            row = conn.execute("SELECT summary FROM reports WHERE id = ? AND finished_at IS NOT NULL",
+                               (report_id,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def _page(self, table: str, columns: str, where: str, args: list, order: str,
+              offset: int, limit: int) -> dict:
+        limit = max(1, min(limit, MAX_PAGE_LIMIT))
+        with closing(self._read()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", args).fetchone()[0]
+            # skip `offset` index entries, not `offset` JSON rows
+            rows = conn.execute(f"SELECT {columns} FROM {table} WHERE rowid IN "
+                                f"(SELECT rowid FROM {table} WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?) "
+                                f"ORDER BY {order}", [*args, limit, max(0, offset)]).fetchall()
+        return {"total": total, "offset": offset, "limit": limit, "items": rows}
+
+    def pages(self, report_id: str, status: int | None = None, issue: str | None = None, url: str | None = None,
+              offset: int = 0, limit: int = PAGE_LIMIT) -> dict:
+        """Returns: {"total", "offset", "limit", "items"}: the pages matching every filter given, in
+        report order. issue is an issue code the page must have (e.g. MISSING_H1)."""
+        if issue is None:
+            where, args = _where(report_id, {"status = ?": status, "url = ?": url})
+            out = self._page("pages", "page", where, args, "rank", offset, limit)
+            out["items"] = [orjson.loads(page) for page, in out["items"]]
+            return out
+
+        # driven by the issues_code index, which lists the pages with the code in rank order
+        where, args = _where(report_id, {
+            "code = ?": issue,
+            "rank < ?": SITE_RANK,
+            "rank IN (SELECT rank FROM pages WHERE report_id = ? AND status = ?)": (report_id, status) if status is not None else None,
+            "rank IN (SELECT rank FROM pages WHERE report_id = ? AND url = ?)": (report_id, url) if url is not None else None,
+        })
+        limit = max(1, min(limit, MAX_PAGE_LIMIT))
+        with closing(self._read()) as conn:
+            total = conn.execute(f"SELECT COUNT(DISTINCT rank) FROM issues WHERE {where}", args).fetchone()[0]
+            rows = conn.execute(f"SELECT page FROM pages WHERE report_id = ? AND rank IN "
+                                f"(SELECT DISTINCT rank FROM issues WHERE {where} ORDER BY rank LIMIT ? OFFSET ?) "
+                                f"ORDER BY rank", [report_id, *args, limit, max(0, offset)]).fetchall()
+        return {"total": total, "offset": offset, "limit": limit, "items": [orjson.loads(page) for page, in rows]}
+
+    def issues(self, report_id: str, priority: str | None = None, code: str | None = None, url: str | None = None,
+               offset: int = 0, limit: int = PAGE_LIMIT) -> dict:
+        """Same shape as pages(): issues in priority_fixes order (page issues in page order, then site-wide ones)."""
+        where, args = _where(report_id, {"priority = ?": priority, "code = ?": code, "url = ?": url})
+        out = self._page("issues", "issue", where, args, "rank, n", offset, limit)
+        out["items"] = [orjson.loads(issue) for issue, in out["items"]]
+        return out
+
+    def broken_links(self, report_id: str, source: str | None = None, offset: int = 0,
+                     limit: int = PAGE_LIMIT) -> dict:
+        where, args = _where(report_id, {"source = ?": source})
+        out = self._page("broken_links", "source, target, status", where, args, "n", offset, limit)
+        out["items"] = [{"from": s, "to": t, "status": code} for s, t, code in out["items"]]
+        return out
+
+    def iter_pages(self, report_id: str) -> Iterator[dict]:
+        with closing(self._read()) as conn:
+            for page, in conn.execute("SELECT page FROM pages WHERE report_id = ? ORDER BY rank", (report_id,)):
+                yield orjson.loads(page)
+
+    def iter_issues(self, report_id: str, priority: str) -> Iterator[dict]:
+        with closing(self._read()) as conn:
+            for issue, in conn.execute("SELECT issue FROM issues WHERE report_id = ? AND priority = ? ORDER BY rank, n",
+                                       (report_id, priority)):
+                yield orjson.loads(issue)
+
+    def iter_json(self, report_id: str, broken_links_limit: int = 200) -> Iterator[bytes]:
+        """The whole report in build_report's shape, as JSON chunks read straight from the rows."""
+        summary = self.summary(report_id)
+        if summary is None:
+            raise KeyError(report_id)
+        conn = self._read()
+        try:
+            q = conn.execute
+            yield b'{"site":' + orjson.dumps(summary["site"]) + b',"inputs":' + orjson.dumps(summary["inputs"])
+            yield b',"priority_fixes":{'
+            for i, pr in enumerate(PRIORITIES):
+                yield (b"," if i else b"") + orjson.dumps(pr) + b":"
+                yield from _json_array(q("SELECT issue FROM issues WHERE report_id = ? AND priority = ? ORDER BY rank, n",
+                                         (report_id, pr)))
+            yield b'},"pages":'
+            yield from _json_array(q("SELECT page FROM pages WHERE report_id = ? ORDER BY rank", (report_id,)))
+            links = q("SELECT source, target, status FROM broken_links WHERE report_id = ? ORDER BY n LIMIT ?",
+                      (report_id, broken_links_limit)).fetchall()
+            yield b',"broken_links":' + orjson.dumps([{"from": s, "to": t, "status": c} for s, t, c in links])
+            for key, value in summary.items():
+                if key not in ("site", "inputs", "report_id", "counts"):
+                    yield b"," + orjson.dumps(key) + b":" + orjson.dumps(value)
+            yield b"}"
+        finally:
+            conn.close()
+
+    def delete(self, report_id: str) -> None:
+        self._write([(f"DELETE FROM {table} WHERE report_id = ?", [(report_id,)]) for table in _TABLES]
+                    + [("DELETE FROM reports WHERE id = ?", [(report_id,)])], commit=True)
+
+    def purge(self, created_before: float) -> None:
+        """Drop reports (finished or abandoned by a crash) older than the cutoff."""
+        with closing(self._read()) as conn:
+            old = conn.execute("SELECT id FROM reports WHERE created_at < ?", (created_before,)).fetchall()
+        for report_id, in old:
+            self.delete(report_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
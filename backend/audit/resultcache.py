@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+import orjson
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+
+from . import metrics
+from .keywords import normalize_keywords
+from .utils import canonicalize_url
+
+RESULT_CACHE_TTL = 600              # seconds a finished report is served from cache
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 256 << 20  # approximate, measured as serialized JSON
+
+def audit_key(url: str, target_keyword: str | None, max_pages: int, max_depth: int,
+              target_keywords: list[str] | None = None) -> tuple:
+    """Requests that would crawl the same thing map to the same key."""
+    keywords = tuple(kw.casefold() for kw in normalize_keywords(target_keyword, target_keywords))
+    return canonicalize_url(url), keywords, max_pages, max_depth
+
+class AuditCache:
+    """
+    LRU + TTL cache of finished reports with single-flight: while an audit for a key is running,
+    identical requests wait for it instead of starting their own crawl.
+    Sync and async callers share the same in-flight entries. If the caller running the audit is
+    cancelled, its waiters aren't: they look the key up again and one of them runs it.
+    """
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[dict, float, int]] = OrderedDict()  # key -> (report, expires, size)
+        self._inflight: dict[tuple, Future] = {}
+        self._bytes = 0
+        self._hits = self._misses = self._coalesced = self._evictions = 0
+
+    def _lookup(self, key: tuple) -> tuple[dict | None, Future, bool]:
+        """Returns: (cached report, in-flight future, whether the caller must run the audit)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._hits += 1
+                    metrics.CACHE.labels("result", "hit").inc()
+                    self._entries.move_to_end(key)
+                    return entry[0], None, False
+                self._drop(key)
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._coalesced += 1
+                metrics.CACHE.labels("result", "coalesced").inc()
+                return None, fut, False
+            self._misses += 1
+            metrics.CACHE.labels("result", "miss").inc()
+            fut = self._inflight[key] = Future()
+            return None, fut, True
+
+    def _drop(self, key: tuple) -> None:
+        _report, _expires, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key: tuple, report: dict) -> None:
+        if "error" in report:
+            return  # blocked/invalid URLs aren't worth a slot
+        size = len(orjson.dumps(report))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (report, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _settle(self, key: tuple, fut: Future, report: dict | None, error: BaseException | None) -> None:
+        if error is None:
+            self._store(key, report)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None or isinstance(error, asyncio.CancelledError):
+            fut.set_result(report)  # None after a cancellation: waiters try again
+        else:
+            fut.set_exception(error)
+
+    def get_or_run(self, key: tuple, run: Callable[[], dict]) -> dict:
+        while True:
+            report, fut, leader = self._lookup(key)
+            if report is not None:
+                return report
+            if leader:
+                break
+            report = fut.result()
+            if report is not None:
+                return report
+        try:
+            report = run()
+        except BaseException as e:
+            self._settle(key, fut, None, e)
+            raise
+        self._settle(key, fut, report, None)
+        return report
+
+    async def aget_or_run(self, key: tuple, run: Callable[[], Awaitable[dict]]) -> dict:
+        while True:
+            report, fut, leader = self._lookup(key)
+            if report is not None:
+                return report
+            if leader:
+                break
+            # shielded: a waiter being cancelled must not cancel the shared future
+            report = await asyncio.shield(asyncio.wrap_future(fut))
+            if report is not None:
+                return report
+        try:
+            report = await run()
+        except BaseException as e:
+            self._settle(key, fut, None, e)
+            raise
+        self._settle(key, fut, report, None)
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "inflight": len(self._inflight),
+                "hit_ratio": round((self._hits + self._coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,105 @@
+import re
+import string
+import httpx
+from dataclasses import dataclass, field
+from urllib.parse import quote, urljoin, urlsplit
+
+from .transport import HEADERS, Transport
+
+# robots.txt as Google reads it: the most specific user-agent group applies, the longest matching
+# Allow/Disallow pattern wins (Allow on a tie), and patterns may use * and a trailing $.
+# urllib.robotparser does neither (first match wins, no wildcards), so rules are parsed here.
+ROBOTS_AGENT = HEADERS["User-Agent"].split("/", 1)[0].lower()  # product token: "seoquickauditbot"
+ROBOTS_MAX_BYTES = 500 * 1024  # Google ignores anything past 500 KiB
+ROBOTS_TIMEOUT = 10
+MAX_CRAWL_DELAY = 10.0         # seconds; a longer Crawl-delay is capped, or one audit would take hours
+
+def _encode(path: str) -> str:
+    # raw non-ASCII in a pattern or URL compares as its %-escapes
+    return quote(path, safe=string.punctuation)
+
+def _pattern(path: str) -> str:
+    anchored = path.endswith("$")
+    rx = re.escape(_encode(path.rstrip("$"))).replace(r"\*", ".*")
+    return rx + ("$" if anchored else "")
+
+@dataclass
+class Robots:
+    """The rules of one host's robots.txt that apply to this crawler. Robots() allows everything."""
+    found: bool = False
+    crawl_delay: float | None = None  # seconds, at most MAX_CRAWL_DELAY
+    sitemaps: list[str] = field(default_factory=list)
+    rules: list[tuple[bool, str]] = field(default_factory=list)  # (allow, path pattern)
+
+    def __post_init__(self):
+        # most specific first, so the first alternative that matches is the rule that applies
+        ordered = sorted(self.rules, key=lambda r: (-len(r[1].rstrip("$")), not r[0]))
+        self._allow = [allow for allow, _ in ordered]
+        self._rx = re.compile("|".join(f"(?P<r{i}>{_pattern(p)})" for i, (_, p) in enumerate(ordered))) if ordered else None
+
+    def allowed(self, url: str) -> bool:
+        if self._rx is None:
+            return True
+        p = urlsplit(url)
+        m = self._rx.match(_encode((p.path or "/") + (f"?{p.query}" if p.query else "")))
+        return m is None or self._allow[int(m.lastgroup[1:])]
+
+def parse_robots(text: str, agent: str = ROBOTS_AGENT) -> Robots:
+    groups: list[dict] = []
+    sitemaps: list[str] = []
+    group = None
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        name, sep, value = line.partition(":")
+        if not sep:
+            continue
+        name, value = name.strip().lower(), value.strip()
+        if name == "sitemap":
+            if value:
+                sitemaps.append(value)
+        elif name == "user-agent":
+            # consecutive user-agent lines share one group; one after a rule starts the next
+            if group is None or group["rules"] or group["delay"] is not None:
+                group = {"agents": [], "rules": [], "delay": None}
+                groups.append(group)
+            group["agents"].append(value.lower())
+        elif group is None:
+            continue  # rules before any user-agent line apply to no one
+        elif name in ("allow", "disallow"):
+            if value:  # an empty Disallow allows everything: no rule
+                group["rules"].append((name == "allow", value))
+        elif name == "crawl-delay":
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            if delay > 0:  # also drops nan
+                group["delay"] = min(delay, MAX_CRAWL_DELAY)
+
+    ours = [g for g in groups if any(a != "*" and agent.startswith(a) for a in g["agents"])]
+    chosen = ours or [g for g in groups if "*" in g["agents"]]
+    delays = [g["delay"] for g in chosen if g["delay"] is not None]
+    return Robots(found=True, crawl_delay=delays[0] if delays else None, sitemaps=sitemaps,
+                  rules=[rule for g in chosen for rule in g["rules"]])
+
+async def fetch_robots(transport: Transport, home: str) -> Robots:
+    """
+    Returns: the site's rules. No robots.txt, an error status or a failed fetch all count as
+    allow-everything: an audit is a one-off, on the site owner's behalf.
+    """
+    url = urljoin(home, "/robots.txt")
+    body = bytearray()
+    try:
+        async with transport.limiter.slot(url):
+            async with transport.client.stream("GET", url, timeout=ROBOTS_TIMEOUT) as r:
+                if r.status_code != 200:
+                    return Robots()
+                async for chunk in r.aiter_bytes():
+                    body += chunk
+                    if len(body) >= ROBOTS_MAX_BYTES:
+                        break
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return Robots()
+    robots = parse_robots(bytes(body[:ROBOTS_MAX_BYTES]).decode("utf-8", "replace"))
+    robots.sitemaps = [urljoin(str(r.url), loc) for loc in robots.sitemaps]  # should be absolute; not always
+    return robots
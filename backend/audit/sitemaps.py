@@ -0,0 +1,79 @@
+import zlib
+import httpx
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from urllib.parse import urljoin
+from lxml import etree
+
+from .transport import Transport
+from .utils import is_http_url
+
+# Sitemaps are streamed: each chunk is inflated (for .xml.gz files) and fed to a pull parser, and
+# every <url>/<sitemap> entry is dropped from the tree once read, so memory stays flat however
+# big the file. The caller stops reading once it has enough URLs, which closes the download.
+SITEMAP_TIMEOUT = 30
+MAX_SITEMAP_FILES = 50          # sitemap files fetched per audit, index files included
+MAX_SITEMAP_BYTES = 1 << 30     # decompressed bytes read from one file; a gzip bomb stops here
+INFLATE_CHUNK = 1 << 20         # inflate at most this much at a time
+
+def _inflate(inflater, data: bytes):
+    out = inflater.decompress(data, INFLATE_CHUNK)
+    while True:
+        yield out
+        if not inflater.unconsumed_tail:
+            return
+        out = inflater.decompress(inflater.unconsumed_tail, INFLATE_CHUNK)
+
+async def _entries(transport: Transport, url: str) -> AsyncIterator[tuple[str, str]]:
+    """Yields ("url", page URL) for a urlset and ("sitemap", child URL) for a sitemap index."""
+    parser = etree.XMLPullParser(events=("end",), tag=("{*}url", "{*}sitemap"),
+                                 resolve_entities=False, no_network=True, remove_comments=True, remove_pis=True)
+    inflater = None
+    total = 0
+    try:
+        async with transport.limiter.slot(url):
+            async with transport.client.stream("GET", url, timeout=SITEMAP_TIMEOUT) as r:
+                if r.status_code != 200:
+                    return
+                first = True
+                async for chunk in r.aiter_bytes():
+                    if first:
+                        # gzip magic: a .xml.gz file (not Content-Encoding, which httpx already undid)
+                        if chunk[:2] == b"\x1f\x8b":
+                            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                        first = False
+                    for data in (_inflate(inflater, chunk) if inflater else (chunk,)):
+                        total += len(data)
+                        if total > MAX_SITEMAP_BYTES:
+                            return
+                        parser.feed(data)
+                        for _, el in parser.read_events():
+                            loc = next(((c.text or "").strip() for c in el if c.tag.rpartition("}")[2] == "loc"), "")
+                            kind = el.tag.rpartition("}")[2]
+                            # free what's been read: the entry and the siblings before it
+                            el.clear()
+                            while el.getprevious() is not None:
+                                del el.getparent()[0]
+                            if loc:
+                                yield kind, loc if "://" in loc else urljoin(url, loc)
+    except (httpx.HTTPError, httpx.InvalidURL, etree.XMLSyntaxError, zlib.error):
+        return  # a broken sitemap ends early; what was read still counts
+
+async def iter_sitemap_urls(transport: Transport, locations: list[str]) -> AsyncIterator[str]:
+    """
+    Yields the page URLs listed in the sitemaps at `locations`, following sitemap index files
+    (breadth first, at most MAX_SITEMAP_FILES files). Close it (aclosing) when stopping early.
+    """
+    pending = deque(dict.fromkeys(loc for loc in locations if is_http_url(loc)))
+    seen = set(pending)
+    fetched = 0
+    while pending and fetched < MAX_SITEMAP_FILES:
+        fetched += 1
+        async with aclosing(_entries(transport, pending.popleft())) as entries:
+            async for kind, loc in entries:
+                if kind == "url":
+                    yield loc
+                elif loc not in seen and is_http_url(loc) and fetched + len(pending) < MAX_SITEMAP_FILES:
+                    seen.add(loc)
+                    pending.append(loc)
@@ -1,6 +1,7 @@
-import re
 from urllib.parse import urlparse
 
+from .keywords import FREQUENT_KEYWORD_HITS
+
 def slug_to_words(url: str) -> str:
     path = urlparse(url).path.strip("/").split("/")[-1]
     path = path.replace("-", " ").replace("_", " ").replace("&", " and ")
@@ -19,20 +20,29 @@ def suggest_description(existing: str | None, keyword: str | None, city: str = "
     s = f"{kw.title()} in {city}. Certified ship chandling, bonded stores & provisions. Fast delivery, compliant docs, 24/7 support. Get a quick quote."
     return s[:160].strip()
 
-def keyword_hits(text: str, keyword: str) -> int:
-    # very basic exact phrase match
-    pattern = re.compile(re.escape(keyword), re.I)
-    return len(pattern.findall(text))
+def _sample(keywords: list[str], limit: int = 5) -> str:
+    more = f" and {len(keywords) - limit} more" if len(keywords) > limit else ""
+    return ", ".join(f'"{kw}"' for kw in keywords[:limit]) + more
 
-def content_tips(word_count: int, has_h1: bool, keyword: str | None, keyword_count: int) -> list[str]:
+def content_tips(word_count: int, has_h1: bool, keyword_hits: dict[str, dict[str, int]]) -> list[str]:
+    """keyword_hits is KeywordMatcher.hits() for the page: every target keyword, found or not."""
     tips = []
     if not has_h1:
         tips.append("Add a clear H1 that matches the primary topic of the page.")
     if word_count < 300:
         tips.append("Content is thin (<300 words). Add helpful sections: services, FAQs, proof, location coverage, process, and next steps.")
-    if keyword and keyword_count == 0:
-        tips.append("Target keyword not found in visible page text. Add it naturally in H1 or first paragraph, and in one subheading.")
-    if keyword and keyword_count > 20:
-        tips.append("Keyword appears very frequently. Reduce repetition and use synonyms; keep copy natural.")
 
+    missing = [kw for kw, h in keyword_hits.items() if h["in_text"] == 0]
+    frequent = [kw for kw, h in keyword_hits.items() if h["in_text"] > FREQUENT_KEYWORD_HITS]
+    if len(keyword_hits) == 1:
+        if missing:
+            tips.append("Target keyword not found in visible page text. Add it naturally in H1 or first paragraph, and in one subheading.")
+        if frequent:
+            tips.append("Keyword appears very frequently. Reduce repetition and use synonyms; keep copy natural.")
+        return tips
+    if missing:
+        tips.append(f"{len(missing)} of {len(keyword_hits)} target keywords not found in visible page text "
+                    f"({_sample(missing)}). Work in the ones relevant to this page: H1, first paragraph, subheadings.")
+    if frequent:
+        tips.append(f"Keywords appear very frequently ({_sample(frequent)}). Reduce repetition and use synonyms; keep copy natural.")
     return tips
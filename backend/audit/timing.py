@@ -0,0 +1,70 @@
+import statistics
+import time
+from contextvars import ContextVar
+
+# Per-page stages, in pipeline order. Values on PageData.timings are milliseconds; a stage that
+# didn't happen for a page (DNS on a pooled connection, parsing a reused page) is left out.
+STAGES = ("dns", "connect", "ttfb", "download", "parse", "extract", "checks", "link_check")
+
+# Timings dict of the fetch running in this task; the resolver adds its DNS time to it
+current: ContextVar[dict | None] = ContextVar("audit_timings", default=None)
+
+def add(timings: dict, stage: str, seconds: float) -> None:
+    timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+
+def trace(timings: dict):
+    """
+    httpcore trace hook (the "trace" request extension) that splits one request into
+    connect / ttfb / download. Redirect hops add up. The DNS lookup runs inside connect_tcp,
+    so it is taken back out of connect.
+    """
+    started: dict[str, float] = {}
+    dns_before = 0.0
+
+    async def hook(event: str, info: dict) -> None:
+        nonlocal dns_before
+        # "connection.connect_tcp.started", "http11.receive_response_headers.complete", ...
+        _, step, phase = event.rsplit(".", 2)
+        now = time.perf_counter()
+        if phase == "started":
+            started[step] = now
+            if step == "connect_tcp":
+                dns_before = timings.get("dns", 0.0)
+            return
+        if phase != "complete" or step not in started:
+            return
+        seconds = now - started.pop(step)
+        if step == "connect_tcp":
+            seconds -= (timings.get("dns", 0.0) - dns_before) / 1000
+            add(timings, "connect", max(seconds, 0.0))
+        elif step == "start_tls":
+            add(timings, "connect", seconds)
+        elif step == "send_request_headers":
+            started["ttfb"] = now - seconds
+        elif step == "receive_response_headers" and "ttfb" in started:
+            add(timings, "ttfb", now - started.pop("ttfb"))
+        elif step == "receive_response_body":
+            add(timings, "download", seconds)
+    return hook
+
+def summarize(all_timings: list[dict]) -> dict:
+    """Returns: {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, max_ms}} over the pages that had the stage."""
+    out = {}
+    for stage in STAGES:
+        values = sorted(t[stage] for t in all_timings if stage in t)
+        if not values:
+            continue
+        if len(values) > 1:
+            q = statistics.quantiles(values, n=20, method="inclusive")
+            p50, p95 = statistics.median(values), q[18]
+        else:
+            p50 = p95 = values[0]
+        out[stage] = {
+            "count": len(values),
+            "total_ms": round(sum(values), 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "max_ms": round(values[-1], 2),
+        }
+    return out
@@ -0,0 +1,190 @@
+import asyncio
+import importlib.util
+import ipaddress
+import os
+import socket
+import time
+import httpcore
+import httpx
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from . import timing
+from .utils import is_private_ip
+
+HEADERS = {"User-Agent": "SEOQuickAuditBot/1.0 (+https://example.com)"}
+TIMEOUT = 15
+
+# Crawl engine limits: total in-flight requests, and in-flight requests per host
+CONCURRENCY = 8
+PER_HOST_CONCURRENCY = 4
+
+DNS_TTL = 300          # seconds a resolved host stays cached
+KEEPALIVE_EXPIRY = 30  # seconds an idle pooled connection is kept open
+HTTP2 = importlib.util.find_spec("h2") is not None  # needs `pip install httpx[http2]`
+# Lets audits reach loopback/private addresses. Only for local benchmarks and tests, never in production.
+ALLOW_PRIVATE_HOSTS = os.getenv("AUDIT_ALLOW_PRIVATE_HOSTS") == "1"
+
+class HostLimiter:
+    """
+    Caps in-flight requests globally and per host, and spaces out request starts on hosts
+    with a crawl delay. One instance is shared by every fetch and link check of a crawl.
+    """
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST_CONCURRENCY):
+        self._global = asyncio.Semaphore(concurrency)
+        self._per_host = per_host
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._delays: dict[str, float] = {}
+        self._next_start: dict[str, float] = {}  # host -> loop time of its next free start
+
+    def set_delay(self, url: str, seconds: float) -> None:
+        """At least `seconds` between the starts of two requests to url's host (robots.txt Crawl-delay)."""
+        self._delays[urlparse(url).netloc.lower()] = seconds
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).netloc.lower()
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self._per_host)
+        # take the host slot first so a busy host never sits on a global slot
+        async with sem:
+            delay = self._delays.get(host)
+            if delay:
+                now = asyncio.get_running_loop().time()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + delay  # claimed before sleeping: waiters queue up
+                if start > now:
+                    await asyncio.sleep(start - now)
+            async with self._global:
+                yield
+
+class Resolver:
+    """
+    TTL'd DNS cache with in-flight deduplication.
+    Every address it hands out has passed the SSRF check, and connections are
+    opened to exactly that address, so a host can't re-resolve to a private IP
+    between the check and the connect.
+    """
+    def __init__(self, ttl: float = DNS_TTL):
+        self.ttl = ttl
+        self._cache: dict[str, tuple[list[str], float]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _lookup(self, host: str) -> list[str]:
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        ips = list(dict.fromkeys(info[4][0] for info in infos))
+        self._cache[host] = (ips, time.monotonic() + self.ttl)
+        return ips
+
+    async def addresses(self, host: str) -> list[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        hit = self._cache.get(host)
+        if hit and hit[1] > time.monotonic():
+            return hit[0]
+        fut = self._inflight.get(host)
+        if fut is None:
+            fut = self._inflight[host] = asyncio.ensure_future(self._lookup(host))
+            fut.add_done_callback(lambda _f: self._inflight.pop(host, None))
+        return await asyncio.shield(fut)
+
+    async def resolve(self, host: str) -> list[str]:
+        """
+        Returns: host's addresses, all public, in resolver order.
+        Raises httpcore.ConnectError if the lookup fails or any address is private.
+        """
+        try:
+            ips = await self.addresses(host)
+        except (OSError, UnicodeError) as e:
+            raise httpcore.ConnectError(f"DNS lookup failed for {host}: {e}") from e
+        if not ips or (not ALLOW_PRIVATE_HOSTS and any(is_private_ip(ip) for ip in ips)):
+            raise httpcore.ConnectError(f"Blocked: {host} resolves to a private address")
+        return ips
+
+    async def is_blocked(self, url: str) -> bool:
+        host = urlparse(url).hostname
+        if not host:
+            return True
+        try:
+            await self.resolve(host)
+        except httpcore.ConnectError:
+            return True
+        return False
+
+class _ResolvingBackend(httpcore.AsyncNetworkBackend):
+    # httpcore still uses the hostname for SNI and certificate checks,
+    # only the TCP connect goes to the pre-resolved IP
+    def __init__(self, resolver: Resolver):
+        self._resolver = resolver
+        self._inner = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        t0 = time.perf_counter()
+        ips = await self._resolver.resolve(host)
+        timings = timing.current.get()
+        if timings is not None:
+            timing.add(timings, "dns", time.perf_counter() - t0)
+        # each address in turn, as a hostname connect would: AAAA first is no use without IPv6 routing
+        for ip in ips:
+            try:
+                return await self._inner.connect_tcp(ip, port, timeout=timeout, local_address=local_address,
+                                                     socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix sockets are not allowed")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._inner.sleep(seconds)
+
+class _PooledTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, resolver: Resolver, limits: httpx.Limits, http2: bool):
+        super().__init__(http2=http2, limits=limits, trust_env=False)
+        # httpx has no public hook for the network backend, so swap in our own pool
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=_ResolvingBackend(resolver),
+        )
+
+class Transport:
+    """
+    The network layer of one audit: a keep-alive connection pool (HTTP/2 when h2 is
+    installed), the shared DNS cache / SSRF guard, and the concurrency limiter.
+
+        async with Transport() as t:
+            r = await t.client.get(url)
+    """
+    def __init__(self, concurrency: int = CONCURRENCY, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 http2: bool = HTTP2):
+        self.resolver = Resolver()
+        self.limiter = HostLimiter(concurrency, per_host_concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency,
+                              keepalive_expiry=KEEPALIVE_EXPIRY)
+        self.client = httpx.AsyncClient(
+            headers=HEADERS, timeout=TIMEOUT, follow_redirects=True, trust_env=False,
+            transport=_PooledTransport(self.resolver, limits, http2),
+        )
+
+    async def is_blocked(self, url: str) -> bool:
+        return await self.resolver.is_blocked(url)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
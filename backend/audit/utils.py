@@ -1,12 +1,42 @@
+import ipaddress
 import re
-import socket
-from urllib.parse import urlparse, urljoin, urldefrag
+import string
+from urllib.parse import urlparse, urljoin, urldefrag, urlsplit, urlunsplit
 
-PRIVATE_NETS = (
-    "10.", "127.", "169.254.", "172.16.", "172.17.", "172.18.", "172.19.",
-    "172.20.", "172.21.", "172.22.", "172.23.", "172.24.", "172.25.",
-    "172.26.", "172.27.", "172.28.", "172.29.", "172.30.", "172.31.", "192.168."
-)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+
+def _normalize_escapes(s: str) -> str:
+    # %7e -> ~ (unreserved characters never need escaping), %2f -> %2F
+    def fix(m: re.Match) -> str:
+        ch = chr(int(m[1], 16))
+        return ch if ch in _UNRESERVED else "%" + m[1].upper()
+    return _ESCAPE.sub(fix, s)
+
+def canonicalize_url(url: str) -> str:
+    """
+    One spelling per URL: lowercase scheme and host, no default port, no fragment, "/" for an
+    empty path, normalized %-escapes and query parameters in sorted order.
+    Malformed URLs (bad port) come back unchanged.
+    """
+    p = urlsplit(url.strip())
+    scheme = p.scheme.lower()
+    try:
+        port = p.port
+    except ValueError:
+        return url
+    host = (p.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if p.username is not None:
+        userinfo = p.username + (f":{p.password}" if p.password is not None else "")
+        host = f"{userinfo}@{host}"
+    path = _normalize_escapes(p.path) or "/"
+    query = "&".join(sorted(_normalize_escapes(part) for part in p.query.split("&") if part))
+    return urlunsplit((scheme, host, path, query, ""))
 
 def normalize_url(base: str, href: str) -> str | None:
     if not href:
@@ -16,7 +46,7 @@ def normalize_url(base: str, href: str) -> str | None:
         return None
     full = urljoin(base, href)
     full, _frag = urldefrag(full)  # remove #fragment
-    return full
+    return canonicalize_url(full)
 
 def same_host(a: str, b: str) -> bool:
     return urlparse(a).netloc.lower() == urlparse(b).netloc.lower()
@@ -24,19 +54,9 @@ def same_host(a: str, b: str) -> bool:
 def is_http_url(u: str) -> bool:
     return urlparse(u).scheme in ("http", "https")
 
-def is_private_host(url: str) -> bool:
-    """
-    Basic SSRF guard: blocks private IP targets.
-    (Not perfect, but good for MVP. For production, harden further.)
-    """
-    host = urlparse(url).hostname
-    if not host:
-        return True
-    # If host is already an IP
-    if re.match(r"^\d{1,3}(\.\d{1,3}){3}$", host):
-        return host.startswith(PRIVATE_NETS)
+def is_private_ip(ip: str) -> bool:
     try:
-        ip = socket.gethostbyname(host)
-        return ip.startswith(PRIVATE_NETS)
-    except Exception:
-        return True
\ No newline at end of file
+        addr = ipaddress.ip_address(ip.split("%", 1)[0])
+    except ValueError:
+        return True
+    return not addr.is_global
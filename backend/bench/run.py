@@ -0,0 +1,230 @@
+"""
+Offline crawl benchmarks against a synthetic local site.
+
+    cd backend
+    python -m bench.run                        # every scenario, compared with bench/baselines.json
+    python -m bench.run --scenario small --pages 500 --slow 0.1
+    python -m bench.run --repeat 3             # median of three runs per scenario: steadier, use it to gate
+    python -m bench.run --save-baseline        # record the current numbers as the new baseline
+
+Each scenario crawls the site in a fresh process (so peak RSS is its own), then times the
+CPU-bound stages (extraction, issue classification, PDF rendering) on the same pages without
+the network. Baselines are only comparable on the same machine: against one recorded elsewhere
+the numbers are shown but nothing is flagged. Timings are compared as ratios to a fixed
+calibration workload timed in the same run, so a busier or slower host doesn't read as a regression.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from dataclasses import asdict, replace
+
+from .server import SiteServer
+from .sitegen import SiteSpec, SyntheticSite
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+TOLERANCE = 0.15  # relative change reported as a regression
+NOISE_FLOOR_S = 0.01  # CPU timings this short are timer noise, whatever their relative change
+
+SCENARIOS = {
+    "small": SiteSpec(pages=100, fanout=6, page_kb=15),
+    "large": SiteSpec(pages=1000, fanout=10, page_kb=25),
+    "hostile": SiteSpec(pages=300, fanout=8, page_kb=20, broken_ratio=0.1, slow_ratio=0.05, slow_ms=400,
+                        redirect_ratio=0.1),
+}
+
+# metric -> True when higher is better
+METRICS = {
+    "pages_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "peak_rss_mb": False,
+    "crawl_cpu_s": False,
+    "extract_cpu_s": False,
+    "classify_cpu_s": False,
+    "pdf_cpu_s": False,
+}
+UNTIMED = frozenset(("peak_rss_mb",))  # metrics that don't scale with the calibration time
+
+def _calibration_work() -> None:
+    data = [{"url": f"https://example.com/p/{i}", "words": [str(i * k) for k in range(8)]} for i in range(2000)]
+    for _ in range(5):
+        sorted(json.loads(json.dumps(data)), key=lambda d: d["words"][-1])
+
+def calibrate(rounds: int = 7) -> float:
+    """Returns: CPU seconds for a fixed pure-Python workload (median of `rounds`), how fast this host is right now."""
+    times = []
+    for _ in range(rounds):
+        cpu0 = time.process_time()
+        _calibration_work()
+        times.append(time.process_time() - cpu0)
+    return round(statistics.median(times), 4)
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+def _run_scenario(spec: SiteSpec, url: str, concurrency: int, out: multiprocessing.Queue) -> None:
+    # child process: audits may reach the loopback server
+    os.environ["AUDIT_ALLOW_PRIVATE_HOSTS"] = "1"
+    from audit import crawler
+    from audit.crawler import analyze_page, run_audit
+    from audit.extract import extract_metrics
+    from audit.pdf_report import build_pdf
+    from audit.prioritize import classify_issues
+
+    latencies = []
+    fetch = crawler.fetch
+
+    async def timed_fetch(*args, **kwargs):
+        result = await fetch(*args, **kwargs)
+        latencies.append(result[2])
+        return result
+    crawler.fetch = timed_fetch
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    report = run_audit(url, "marine supply", max_pages=spec.pages, max_depth=50, concurrency=concurrency)
+    wall, crawl_cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    crawler.fetch = fetch
+
+    corpus = SyntheticSite(spec).corpus(limit=500)
+    cpu0 = time.process_time()
+    for html in corpus:
+        extract_metrics(html)
+    extract_cpu = time.process_time() - cpu0
+
+    pages = [analyze_page(f"{url}p/{i}", 200, html, url, ("marine supply",))[0] for i, html in enumerate(corpus)]
+    cpu0 = time.process_time()
+    for page in pages:
+        classify_issues(page)
+    classify_cpu = time.process_time() - cpu0
+
+    cpu0 = time.process_time()
+    build_pdf(report)
+    pdf_cpu = time.process_time() - cpu0
+
+    crawled = report.get("site", {}).get("pages_crawled", 0)
+    out.put({
+        "pages_crawled": crawled,
+        "wall_s": round(wall, 3),
+        "pages_per_sec": round(crawled / wall, 2) if wall else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "crawl_cpu_s": round(crawl_cpu, 3),
+        "extract_cpu_s": round(extract_cpu, 3),
+        "classify_cpu_s": round(classify_cpu, 4),
+        "pdf_cpu_s": round(pdf_cpu, 3),
+    })
+
+def machine() -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+def run(spec: SiteSpec, concurrency: int, repeat: int = 1) -> dict:
+    """Returns: the scenario's numbers, each the median of `repeat` runs."""
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    with SiteServer(SyntheticSite(spec)) as server:
+        for _ in range(repeat):
+            out = ctx.Queue()
+            proc = ctx.Process(target=_run_scenario, args=(spec, server.url, concurrency, out))
+            proc.start()
+            runs.append(out.get())
+            proc.join()
+    return {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+def compare(name: str, result: dict, baseline: dict | None, comparable: bool = True,
+            slowdown: float = 1.0) -> list[str]:
+    """
+    comparable: False for a baseline from another machine (or without a calibration time), whose
+    changes are shown but not flagged.
+    slowdown: this run's calibration time over the baseline's; timings are judged after scaling by it.
+    """
+    lines = [f"== {name}: {result['pages_crawled']} pages in {result['wall_s']}s"]
+    regressions = []
+    for metric, higher_better in METRICS.items():
+        value = result[metric]
+        base = (baseline or {}).get(metric)
+        if not base:
+            lines.append(f"  {metric:16} {value:>10}")
+            continue
+        scale = 1.0 if metric in UNTIMED else slowdown
+        change = (value * (scale if higher_better else 1 / scale) - base) / base
+        worse = comparable and (change < -TOLERANCE if higher_better else change > TOLERANCE)
+        if metric.endswith("_s") and max(value, base) < NOISE_FLOOR_S:
+            worse = False
+        flag = "  REGRESSION" if worse else ""
+        lines.append(f"  {metric:16} {value:>10}  (baseline {base}, {change:+.1%}){flag}")
+        if worse:
+            regressions.append(metric)
+    return lines + ([f"  regressed: {', '.join(regressions)}"] if regressions else [])
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                    help="scenario(s) to run (default: all)")
+    ap.add_argument("--pages", type=int)
+    ap.add_argument("--fanout", type=int)
+    ap.add_argument("--page-kb", type=int)
+    ap.add_argument("--broken", type=float, help="share of pages linking to a 404")
+    ap.add_argument("--slow", type=float, help="share of slow pages")
+    ap.add_argument("--slow-ms", type=int)
+    ap.add_argument("--redirects", type=float, help="share of links that redirect")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=1, help="runs per scenario; the median is reported")
+    ap.add_argument("--json", help="also write results to this file")
+    ap.add_argument("--save-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    overrides = {k: v for k, v in {
+        "pages": args.pages, "fanout": args.fanout, "page_kb": args.page_kb, "broken_ratio": args.broken,
+        "slow_ratio": args.slow, "slow_ms": args.slow_ms, "redirect_ratio": args.redirects,
+    }.items() if v is not None}
+
+    baselines, recorded_on = {}, None
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            saved = json.load(f)
+        baselines, recorded_on = saved.get("scenarios", {}), saved.get("machine")
+    here = machine()
+    same_machine = recorded_on == here
+    if baselines and not same_machine:
+        print(f"baselines were recorded on {recorded_on}, this is {here}: changes are not flagged")
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        spec = replace(SCENARIOS[name], **overrides)
+        calibration = calibrate()
+        result = run(spec, args.concurrency, max(1, args.repeat))
+        results[name] = {"spec": asdict(spec), "calibration_s": calibration, **result}
+        # a baseline only means something for the same site shape
+        base = baselines.get(name)
+        if base and base.get("spec") != asdict(spec):
+            base = None
+        comparable = same_machine and bool(base and base.get("calibration_s"))
+        slowdown = calibration / base["calibration_s"] if comparable else 1.0
+        print("\n".join(compare(name, result, base, comparable, slowdown)))
+        note = f", timings scaled by {1 / slowdown:.2f}" if comparable else ", not comparable" if base else ""
+        print(f"  calibration {calibration}s{note}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        # numbers from another machine can't sit next to these ones
+        baselines = {**(baselines if same_machine else {}), **results}
+        with open(BASELINES, "w") as f:
+            json.dump({"machine": here, "scenarios": baselines}, f, indent=2)
+            f.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
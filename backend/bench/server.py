@@ -0,0 +1,53 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .sitegen import SyntheticSite
+
+class _Handler(BaseHTTPRequestHandler):
+    site: SyntheticSite
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real server
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def _respond(self, send_body: bool):
+        path = self.path.split("?", 1)[0]
+        status, headers, body = self.site.resolve(path)
+        if status == 200 and path.startswith("/p/") and self.site.is_slow(int(path.rsplit("/", 1)[1])):
+            time.sleep(self.site.spec.slow_ms / 1000)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+class SiteServer:
+    """Serves a SyntheticSite on 127.0.0.1 from a background thread."""
+    def __init__(self, site: SyntheticSite, port: int = 0):
+        site.warm()
+        handler = type("Handler", (_Handler,), {"site": site})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,88 @@
+import random
+from dataclasses import dataclass
+
+WORDS = ("marine supply ship chandling bonded stores provisions delivery port vessel crew spare parts "
+         "engine deck safety certified compliant quote service fast support logistics harbour").split()
+
+@dataclass
+class SiteSpec:
+    pages: int = 200
+    fanout: int = 8            # internal links per page
+    page_kb: int = 20          # approximate HTML size per page
+    broken_ratio: float = 0.0  # share of pages that also link to a 404
+    slow_ratio: float = 0.0    # share of pages answered after slow_ms
+    slow_ms: int = 300
+    redirect_ratio: float = 0.0  # share of links that go through a 301 first
+    seed: int = 1
+
+class SyntheticSite:
+    """
+    Deterministic site: the same spec always yields the same pages, links and statuses.
+    Page i links to pages (i * fanout + k) % pages, so every page is reachable from / and
+    the depth grows like log_fanout(pages).
+    """
+    def __init__(self, spec: SiteSpec):
+        self.spec = spec
+        self._pages: dict[int, bytes] = {}
+
+    def warm(self) -> None:
+        """Renders every page up front so serving measures the crawler, not the generator."""
+        for i in range(self.spec.pages):
+            self._page_bytes(i)
+
+    def _page_bytes(self, i: int) -> bytes:
+        body = self._pages.get(i)
+        if body is None:
+            body = self._pages[i] = self.render_page(i).encode()
+        return body
+
+    def _rng(self, i: int) -> random.Random:
+        return random.Random(self.spec.seed * 1_000_003 + i)
+
+    def is_slow(self, i: int) -> bool:
+        return self._rng(i).random() < self.spec.slow_ratio
+
+    def page_path(self, i: int) -> str:
+        return "/" if i == 0 else f"/p/{i}"
+
+    def render_page(self, i: int) -> str:
+        spec, rng = self.spec, self._rng(i)
+        links = []
+        for k in range(1, spec.fanout + 1):
+            j = (i * spec.fanout + k) % spec.pages
+            href = f"/r/{j}" if rng.random() < spec.redirect_ratio else self.page_path(j)
+            links.append(f'<li><a href="{href}">{rng.choice(WORDS)} {j}</a></li>')
+        if rng.random() < spec.broken_ratio:
+            links.append(f'<li><a href="/missing/{i}">gone</a></li>')
+
+        head = (f"<!doctype html><html><head><meta charset='utf-8'><title>{rng.choice(WORDS).title()} page {i % 50}</title>"
+                f"<meta name='description' content='Synthetic page {i}'>"
+                "<link rel='stylesheet' href='/s.css'><script src='/a.js'></script></head><body>")
+        nav = f"<h1>Page {i}</h1><nav><ul>{''.join(links)}</ul></nav>"
+        imgs = "".join(f"<img src='/i/{n}.png' alt='{'x' if n % 2 else ''}'>" for n in range(rng.randint(0, 12)))
+
+        body, size = [], len(head) + len(nav) + len(imgs)
+        target = spec.page_kb * 1024
+        while size < target:
+            para = "<p>" + " ".join(rng.choice(WORDS) for _ in range(60)) + "</p>"
+            body.append(para)
+            size += len(para)
+        return head + nav + imgs + "".join(body) + "</body></html>"
+
+    def resolve(self, path: str) -> tuple[int, dict, bytes]:
+        """Returns: (status, headers, body) for a request path."""
+        if path == "/":
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, self._page_bytes(0)
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < self.spec.pages:
+            kind, i = parts[0], int(parts[1])
+            if kind == "p":
+                return 200, {"Content-Type": "text/html; charset=utf-8"}, self._page_bytes(i)
+            if kind == "r":
+                return 301, {"Location": self.page_path(i)}, b""
+        return 404, {"Content-Type": "text/html"}, b"<html><body>not found</body></html>"
+
+    def corpus(self, limit: int | None = None) -> list[str]:
+        """Rendered HTML of the first `limit` pages, for network-free stage benchmarks."""
+        n = self.spec.pages if limit is None else min(limit, self.spec.pages)
+        return [self.render_page(i) for i in range(n)]
@@ -0,0 +1,81 @@
+import asyncio
+import codecs
+import gzip
+
+import httpx
+import pytest
+
+from audit.content import CHARSET_PRESCAN, MAX_BODY_BYTES, decode_html, is_html, media_type, read_body
+
+TEXT = "<p>Café – naïve</p>"
+
+@pytest.mark.parametrize("body, content_type, expected", [
+    # BOM beats everything, even a header that says otherwise
+    (codecs.BOM_UTF8 + TEXT.encode("utf-8"), "text/html; charset=iso-8859-1", TEXT),
+    (codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le"), "text/html; charset=utf-8", TEXT),
+    (codecs.BOM_UTF16_BE + TEXT.encode("utf-16-be"), None, TEXT),
+    # header beats <meta>
+    (b"<meta charset='utf-8'>" + TEXT.encode("cp1252"), "text/html; charset=windows-1252", "<meta charset='utf-8'>" + TEXT),
+    (TEXT.encode("utf-8"), 'text/html; charset="UTF-8"', TEXT),
+    # <meta> beats the UTF-8 default
+    (b'<meta http-equiv="Content-Type" content="text/html; charset=cp1252">' + TEXT.encode("cp1252"), "text/html",
+     '<meta http-equiv="Content-Type" content="text/html; charset=cp1252">' + TEXT),
+    (b"<META CHARSET=iso-8859-1>" + TEXT.encode("cp1252"), None, "<META CHARSET=iso-8859-1>" + TEXT),
+    # nothing declared: UTF-8
+    (TEXT.encode("utf-8"), "text/html", TEXT),
+])
+def test_decode_precedence(body, content_type, expected):
+    assert decode_html(body, content_type) == expected
+
+def test_latin1_labels_mean_windows_1252():
+    # 0x93/0x94 are curly quotes in windows-1252, C1 controls in real latin-1
+    assert decode_html(b"\x93hi\x94", "text/html; charset=ISO-8859-1") == "“hi”"
+
+def test_unknown_header_charset_falls_through_to_meta():
+    body = b"<meta charset=cp1252>" + "é".encode("cp1252")
+    assert decode_html(body, "text/html; charset=no-such-charset") == "<meta charset=cp1252>é"
+
+def test_meta_cannot_claim_utf16():
+    body = b"<meta charset=utf-16>" + "é".encode("utf-8")
+    assert decode_html(body, None) == "<meta charset=utf-16>é"
+
+def test_meta_past_prescan_is_ignored():
+    body = b"<!--" + b" " * CHARSET_PRESCAN + b"--><meta charset=cp1252>" + "é".encode("cp1252")
+    assert decode_html(body, None).endswith("�")
+
+def test_undecodable_bytes_are_replaced():
+    assert decode_html(b"ok \xff\xfe bytes", "text/html; charset=utf-8") == "ok �� bytes"
+
+def test_media_type():
+    assert media_type("Text/HTML; charset=utf-8") == "text/html"
+    assert media_type("") is None and media_type(None) is None
+    assert is_html(None) and is_html("application/xhtml+xml") and not is_html("application/pdf")
+
+def read(response: httpx.Response, limit: int = MAX_BODY_BYTES) -> tuple[bytes, bool]:
+    return asyncio.run(read_body(response, limit))
+
+def streamed(chunks: list[bytes], pulled: list[int], headers: dict | None = None) -> httpx.Response:
+    async def body():
+        for chunk in chunks:
+            pulled.append(len(chunk))
+            yield chunk
+    return httpx.Response(200, headers=headers, content=body())
+
+def test_read_body_under_limit():
+    pulled = []
+    assert read(streamed([b"a" * 10, b"b" * 10], pulled), limit=20) == (b"a" * 10 + b"b" * 10, False)
+
+def test_read_body_truncates_and_stops_reading():
+    pulled = []
+    chunks = [bytes([65 + i]) * 100 for i in range(10)]
+    body, truncated = read(streamed(chunks, pulled), limit=250)
+    assert truncated
+    assert body == b"".join(chunks)[:250]
+    assert len(pulled) == 3  # the rest of the stream is never pulled
+
+def test_read_body_limit_counts_decompressed_bytes():
+    html = b"<p>" + b"x" * 10_000 + b"</p>"
+    compressed = gzip.compress(html)
+    assert len(compressed) < 1000
+    body, truncated = read(streamed([compressed], [], {"Content-Encoding": "gzip"}), limit=1000)
+    assert truncated and body == html[:1000]
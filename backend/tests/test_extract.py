@@ -0,0 +1,88 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from audit import checks
+from audit.extract import extract_metrics
+from bench.sitegen import SiteSpec, SyntheticSite
+
+# The BeautifulSoup helpers in checks.py are the reference implementation: the single-pass
+# lxml walk in extract.py has to give the same answers on every document.
+DOCUMENTS = {
+    "empty_body": "<html><head></head><body></body></html>",
+    "no_head": "<p>just a paragraph, no html or head tags</p>",
+    "title_markup": "<title>  Ship <b>chandler</b> &amp; supply  </title><p>x</p>",
+    "blank_title": "<html><head><title>   </title></head><body>text</body></html>",
+    "two_titles": "<title>first</title><title>second</title>",
+    "meta_case": "<meta NAME='Description' content='  Upper case name  '><meta name='description' content='second'>",
+    "meta_empty": "<meta name='description' content='   '><meta name='keywords' content='a,b'>",
+    "meta_missing_content": "<meta name='description'>",
+    "meta_not_exact": "<meta name='og:description' content='nope'><meta name='description ' content='nope'>",
+    "headings": "<h1>one</h1><h2>a</h2><h2>b</h2><h3></h3><h4>d</h4><h5>e</h5><h6>f</h6><h6>g</h6>",
+    "h1_markup": "<h1>Marine <em>supply</em>\n  <span>services</span></h1><h1>   </h1><h1><img alt='logo'></h1>",
+    "h1_nested": "<h1>outer <h1>inner</h1> tail</h1><div><h1>Second</h1></div>",
+    "h1_script": "<h1>visible<script>var hidden = 1;</script> text</h1>",
+    "images": ("<img src='a.png' alt='ok' width='10' height='10'><img src='b.png' alt=''>"
+               "<img src='c.png' alt='   '><img src='d.png'><img src='e.png' alt='x' width='10'>"
+               "<img src='f.png' alt='y' width='' height='5'>"),
+    "stylesheets": ("<link rel='stylesheet' href='a.css'><link rel='Stylesheet' href='b.css'>"
+                    "<link rel='preload stylesheet' href='c.css'><link rel='icon' href='i.ico'>"
+                    "<link href='no-rel.css'>"),
+    "invisible_text": ("<style>body { color: red }</style><p>shown</p><script>not shown</script>"
+                       "<template>hidden template</template><ruby>kanji<rp>(</rp><rt>kana</rt><rp>)</rp></ruby>"),
+    "comments": "<p>before<!-- a comment with words -->after</p><!-- top level --> tail words",
+    "whitespace": "<p>  lots\n\tof   \n whitespace  </p><p> non breaking </p>",
+    "entities": "<p>caf&eacute; &lt;tag&gt; &nbsp; fish&amp;chips</p>",
+    "unclosed": "<html><body><p>open <b>bold <i>italic<p>next<h1>head <img alt=x>",
+    "many_tips": ("<script></script>" * 21 + "<link rel='stylesheet' href='s.css'>" * 11
+                  + "<img src='i.png'>" * 26),
+}
+
+def reference(html: str) -> dict:
+    soup = BeautifulSoup(html, "lxml")
+    total, missing = checks.image_alt_counts(soup)
+    return {
+        "title": checks.get_title(soup),
+        "meta_description": checks.get_meta_description(soup),
+        "headings": checks.heading_counts(soup),
+        "h1": checks.get_h1_texts(soup),
+        "images_total": total,
+        "images_missing_alt": missing,
+        "word_count": checks.extract_text_word_count(soup),
+        "text": soup.get_text(" ", strip=True),
+        "speed_tips": checks.basic_speed_tips(soup),
+        "links": [a.get("href") for a in soup.find_all("a")],
+    }
+
+def extracted(html: str) -> dict:
+    m = extract_metrics(html)
+    return {
+        "title": m.title,
+        "meta_description": m.meta_description,
+        "headings": m.headings,
+        "h1": m.h1,
+        "images_total": m.images_total,
+        "images_missing_alt": m.images_missing_alt,
+        "word_count": m.word_count,
+        "text": m.text,
+        "speed_tips": checks.speed_tips(m.scripts, m.stylesheets, m.images_total, m.images_missing_dims),
+        "links": m.links,
+    }
+
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_matches_beautifulsoup(name):
+    html = DOCUMENTS[name]
+    assert extracted(html) == reference(html)
+
+def test_matches_beautifulsoup_on_synthetic_pages():
+    site = SyntheticSite(SiteSpec(pages=20, page_kb=4, broken_ratio=0.3, redirect_ratio=0.2))
+    for html in site.corpus():
+        assert extracted(html) == reference(html)
+
+def test_bytes_and_str_agree():
+    html = "<meta charset='utf-8'><title>café</title><p>naïve résumé</p>"
+    assert extract_metrics(html.encode("utf-8")) == extract_metrics(html)
+
+def test_empty_document():
+    m = extract_metrics("")
+    assert m.title is None and m.word_count == 0 and m.links == []
+    assert m.headings == {f"h{lvl}": 0 for lvl in range(1, 7)}
@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+import pytest
+
+from audit import frontier as frontier_module
+from audit.frontier import BloomFilter, Frontier, SeenSet, dedup_key
+
+@pytest.mark.parametrize("canonical, expected", [
+    ("https://example.com/about/", "https://example.com/about"),
+    ("https://example.com/about", "https://example.com/about"),
+    ("https://example.com/", "https://example.com/"),              # the root keeps its slash
+    ("https://example.com/a//", "https://example.com/a"),
+    ("https://example.com/a/?q=1", "https://example.com/a?q=1"),
+    ("https://example.com/?q=1", "https://example.com/?q=1"),
+])
+def test_dedup_key(canonical, expected):
+    assert dedup_key(canonical) == expected
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"https://example.com/p/{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"https://example.com/q/{i}" in bloom for i in range(10_000))
+    assert false_positives < 300  # ~1% expected at capacity
+
+def test_seen_set_falls_back_to_bloom_filter():
+    seen = SeenSet(exact_limit=10)
+    keys = [f"https://example.com/p/{i}" for i in range(50)]
+    for key in keys[:10]:
+        seen.add(key)
+    assert seen._bloom is None
+    for key in keys[10:]:
+        seen.add(key)
+    assert len(seen._exact) == 10  # stops growing past the limit
+    assert seen._bloom is not None
+    assert all(key in seen for key in keys)
+    assert "https://example.com/never-added" not in seen
+
+def drain(frontier: Frontier) -> list[tuple[int, int, str]]:
+    async def run():
+        out = []
+        while len(frontier):
+            out.append(await frontier.get())
+        return out
+    return asyncio.run(run())
+
+def test_add_dedups_canonical_forms():
+    frontier = Frontier()
+    assert frontier.add("https://Example.com/a/", 0)
+    assert not frontier.add("https://example.com:443/a#x", 0)
+    assert not frontier.add("https://example.com/a", 1)
+    assert frontier.is_seen("HTTPS://EXAMPLE.COM/a")
+    assert [url for _, _, url in drain(frontier)] == ["https://example.com/a/"]
+
+def test_get_is_shallowest_first_in_add_order():
+    frontier = Frontier()
+    for depth, url in [(2, "/c1"), (1, "/b1"), (2, "/c2"), (0, "/a"), (1, "/b2")]:
+        frontier.add("https://example.com" + url, depth)
+    got = drain(frontier)
+    assert [(d, url.rsplit("/", 1)[1]) for d, _, url in got] == [
+        (0, "a"), (1, "b1"), (1, "b2"), (2, "c1"), (2, "c2")]
+    assert [seq for _, seq, _ in got] == [0, 1, 2, 3, 4]
+
+def test_spill_to_disk_keeps_order(monkeypatch):
+    monkeypatch.setattr(frontier_module, "SPILL_READ_BATCH", 3)  # several refills per depth
+    frontier = Frontier(memory_items=5)
+    urls = {d: [f"https://example.com/d{d}/{i}" for i in range(20)] for d in (1, 2)}
+    for i in range(20):
+        for d in (2, 1):
+            frontier.add(urls[d][i], d)
+    spill_dir = frontier._tmpdir.name
+    assert sorted(os.listdir(spill_dir)) == ["depth-1.txt", "depth-2.txt"]
+    assert sum(q.in_memory() for q in frontier._queues.values()) == 5
+    assert len(frontier) == 40
+
+    got = drain(frontier)
+    assert [url for _, _, url in got] == urls[1] + urls[2]
+    frontier.close()
+    assert not os.path.exists(spill_dir)
+
+def test_spill_file_is_reused_after_draining():
+    frontier = Frontier(memory_items=2)
+    first = [f"https://example.com/a/{i}" for i in range(6)]
+    for url in first:
+        frontier.add(url, 1)
+    assert [url for _, _, url in drain(frontier)] == first
+    second = [f"https://example.com/b/{i}" for i in range(6)]
+    for url in second:
+        frontier.add(url, 1)
+    assert [url for _, _, url in drain(frontier)] == second
+    frontier.close()
+
+def test_links_queue_in_parent_order():
+    # pages finish out of order, links still queue in (parent seq, link index) order
+    async def run():
+        frontier = Frontier()
+        frontier.add("https://example.com/", 0)
+        _, root, _ = await frontier.get()
+        frontier.add("https://example.com/a", 1, parent=root)
+        frontier.add("https://example.com/b", 1, parent=root)
+        frontier.task_done(root)
+        _, a, _ = await frontier.get()
+        _, b, _ = await frontier.get()
+        frontier.add("https://example.com/b1", 2, parent=b)
+        frontier.add("https://example.com/shared", 2, parent=b)
+        frontier.task_done(b)
+        assert len(frontier) == 0  # held until a is done
+        assert frontier.is_seen("https://example.com/shared")
+        frontier.add("https://example.com/a1", 2, parent=a)
+        frontier.add("https://example.com/shared", 2, parent=a)
+        frontier.task_done(a)
+        urls = []
+        while len(frontier):
+            _, seq, url = await frontier.get()
+            urls.append(url.rsplit("/", 1)[1])
+            frontier.task_done(seq)
+        await frontier.join()
+        return urls
+    assert asyncio.run(run()) == ["a1", "shared", "b1"]
+
+def test_hold_keeps_late_links_ahead_of_later_pages():
+    async def run():
+        frontier = Frontier()
+        frontier.hold()
+        frontier.add("https://example.com/", 0)
+        _, root, _ = await frontier.get()
+        frontier.add("https://example.com/a", 1, parent=root)
+        frontier.task_done(root)
+        _, a, _ = await frontier.get()
+        frontier.add("https://example.com/from-a", 2, parent=a)
+        frontier.task_done(a)
+        frontier.add("https://example.com/sitemap", 1, parent=root, late=True)
+        assert len(frontier) == 1  # the sitemap entry; a's links wait for release()
+        frontier.release()
+        return [url.rsplit("/", 1)[1] for _, _, url in [await frontier.get() for _ in range(len(frontier))]]
+    assert asyncio.run(run()) == ["sitemap", "from-a"]
@@ -0,0 +1,58 @@
+import random
+import re
+
+import pytest
+
+from audit.keywords import KeywordMatcher, matcher_for, normalize_keywords
+
+def brute_force(keywords, text):
+    """Every (possibly overlapping) run of the keyword's words in the text's words."""
+    words = re.findall(r"\w+", (text or "").casefold())
+    counts = []
+    for kw in keywords:
+        kw_words = re.findall(r"\w+", kw.casefold())
+        n = len(kw_words)
+        counts.append(sum(words[i:i + n] == kw_words for i in range(len(words) - n + 1)) if n else 0)
+    return counts
+
+@pytest.mark.parametrize("keywords, text, expected", [
+    (["ship"], "Ship ship, SHIP! shipping ships", [3]),                 # whole words only
+    (["ship chandler"], "ship-chandler; ship   chandler\nship\tchandler", [3]),
+    (["a a"], "a a a a", [3]),                                          # overlapping
+    (["a b a"], "a b a b a b a", [3]),
+    (["he", "she he", "he she"], "she he she he", [2, 2, 1]),
+    (["b c", "a b c d", "c"], "a b c d", [1, 1, 1]),                    # suffixes of a longer match
+    (["port", "port of call"], "port of port of call", [2, 1]),
+    (["straße"], "STRASSE strasse Straße", [3]),                        # casefold, not lower
+    (["café"], "Café, cafe", [1]),
+    (["c++", "--"], "c++ c", [2, 0]),                                  # punctuation isn't a word
+    (["x"], None, [0]),
+    (["ship_chandler"], "ship_chandler ship chandler", [1]),            # _ is a word character
+])
+def test_counts(keywords, text, expected):
+    assert KeywordMatcher(keywords).count(text) == expected
+    assert brute_force(keywords, text) == expected
+
+def test_matches_brute_force_on_random_text():
+    rng = random.Random(7)
+    vocab = ["a", "b", "c", "ship", "port", "d-e"]
+    for _ in range(300):
+        keywords = [" ".join(rng.choice(vocab) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        text = rng.choice(["", " ", ", ", "\n"]).join(
+            rng.choice(vocab + ["x", "SHIP", "Port."]) for _ in range(rng.randint(0, 60)))
+        assert KeywordMatcher(keywords).count(text) == brute_force(keywords, text), (keywords, text)
+
+def test_hits_count_each_h1_alone():
+    m = KeywordMatcher(["ship chandler", "ship"])
+    hits = m.hits("ship chandler and ship", "Ship Chandler", ["Marine ship", "chandler"])
+    assert hits == {
+        "ship chandler": {"in_text": 1, "in_title": 1, "in_h1": 0},
+        "ship": {"in_text": 2, "in_title": 1, "in_h1": 1},
+    }
+
+def test_normalize_keywords():
+    assert normalize_keywords("  Ship   Chandler ", ["ship chandler", "", None, "Port", "PORT"]) == ("Ship Chandler", "Port")
+    assert normalize_keywords(None, None) == ()
+
+def test_matcher_for_is_cached():
+    assert matcher_for(("a", "b")) is matcher_for(("a", "b"))
@@ -0,0 +1,27 @@
+import numpy as np
+
+from audit.linkgraph import LinkGraph, pagerank
+
+def test_pagerank_without_edges():
+    # crawled pages that don't link to each other: no edges at all
+    rank = pagerank(np.zeros(4, dtype=np.int64), np.empty(0, dtype=np.int32))
+    assert rank.dtype == float
+    assert np.allclose(rank, 1 / 3)
+
+def test_single_page():
+    graph = LinkGraph()
+    graph.add_page("https://example.com/", [])
+    stats = graph.stats("https://example.com/")
+    assert stats.links == 0
+    assert stats.inbound.tolist() == [0]
+    assert stats.click_depth.tolist() == [0]
+    assert np.allclose(stats.pagerank, [1.0])
+
+def test_links_only_to_uncrawled_pages():
+    graph = LinkGraph()
+    graph.add_page("https://example.com/", ["https://example.com/a", "https://example.com/"])
+    graph.add_page("https://example.com/b", ["https://example.com/c"])
+    stats = graph.stats("https://example.com/")
+    assert stats.links == 0
+    assert stats.click_depth.tolist() == [0, -1]
+    assert np.allclose(stats.pagerank, [0.5, 0.5])
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import types
+
+import orjson
+import pytest
+
+from audit import resultcache
+from audit.resultcache import AuditCache, audit_key
+
+KEY = ("https://example.com/", (), 25, 2)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resultcache, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+def test_audit_key_normalizes_requests():
+    assert audit_key("HTTPS://Example.com:443/#x", " Ship  Chandler ", 25, 2, ["ship chandler", "Port"]) == \
+        audit_key("https://example.com/", "ship chandler", 25, 2, ["port"])
+    assert audit_key("https://example.com/", None, 25, 2) != audit_key("https://example.com/", None, 10, 2)
+
+def test_concurrent_requests_share_one_run():
+    cache = AuditCache()
+    calls = 0
+
+    async def run():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"pages": calls}
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_run(KEY, run) for _ in range(5)))
+
+    reports = asyncio.run(main())
+    assert calls == 1
+    assert all(r is reports[0] for r in reports)
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["inflight"]) == (1, 4, 0, 0)
+    assert asyncio.run(cache.aget_or_run(KEY, run)) is reports[0]
+    assert cache.stats()["hits"] == 1 and calls == 1
+
+def test_waiters_retry_when_the_leader_is_cancelled():
+    cache = AuditCache()
+    calls = 0
+
+    async def main():
+        started = asyncio.Event()
+
+        async def run():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await asyncio.sleep(0.05 if calls == 1 else 0.01)
+            return {"run": calls}
+
+        leader = asyncio.create_task(cache.aget_or_run(KEY, run))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.aget_or_run(KEY, run)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    reports = asyncio.run(main())
+    assert calls == 2  # one waiter took over, the others waited on it
+    assert reports == [{"run": 2}] * 3
+    assert cache.stats()["inflight"] == 0
+
+def test_cancelled_waiter_does_not_cancel_the_run():
+    cache = AuditCache()
+
+    async def main():
+        async def run():
+            await asyncio.sleep(0.02)
+            return {"ok": True}
+
+        leader = asyncio.create_task(cache.aget_or_run(KEY, run))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget_or_run(KEY, run))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == {"ok": True}
+
+def test_errors_reach_waiters_and_are_not_cached():
+    cache = AuditCache()
+
+    async def main():
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("crawl failed")
+        return await asyncio.gather(*(cache.aget_or_run(KEY, fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.stats()["entries"] == 0 and cache.stats()["inflight"] == 0
+    assert cache.get_or_run(KEY, lambda: {"error": "Invalid or blocked URL."}) == {"error": "Invalid or blocked URL."}
+    assert cache.stats()["entries"] == 0  # error reports aren't stored either
+
+def test_sync_callers_join_async_runs():
+    cache = AuditCache()
+    got = []
+
+    async def main():
+        async def run():
+            await asyncio.sleep(0.05)
+            return {"from": "async"}
+        task = asyncio.create_task(cache.aget_or_run(KEY, run))
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=lambda: got.append(cache.get_or_run(KEY, lambda: {"from": "sync"})))
+        thread.start()
+        report = await task
+        await asyncio.to_thread(thread.join)
+        return report
+
+    assert asyncio.run(main()) == {"from": "async"}
+    assert got == [{"from": "async"}]
+    assert cache.stats()["coalesced"] == 1
+
+def test_entries_expire_after_ttl(clock):
+    cache = AuditCache(ttl=60)
+    assert cache.get_or_run(KEY, lambda: {"run": 1}) == {"run": 1}
+    clock.now += 59
+    assert cache.get_or_run(KEY, lambda: {"run": 2}) == {"run": 1}
+    clock.now += 2
+    assert cache.get_or_run(KEY, lambda: {"run": 3}) == {"run": 3}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+def test_lru_eviction_by_entries():
+    cache = AuditCache(max_entries=2)
+    keys = [("https://example.com/", (), n, 2) for n in range(3)]
+    cache.get_or_run(keys[0], lambda: {"n": 0})
+    cache.get_or_run(keys[1], lambda: {"n": 1})
+    cache.get_or_run(keys[0], lambda: {"n": -1})  # a hit: keys[0] is now the most recent
+    cache.get_or_run(keys[2], lambda: {"n": 2})
+    assert cache.get_or_run(keys[0], lambda: {"n": -1}) == {"n": 0}
+    assert cache.get_or_run(keys[1], lambda: {"n": 11}) == {"n": 11}  # evicted, ran again
+    assert cache.stats()["evictions"] == 2
+
+def test_lru_eviction_by_bytes():
+    report = {"pages": ["x" * 100]}
+    size = len(orjson.dumps(report))
+    cache = AuditCache(max_bytes=size * 2)
+    keys = [("https://example.com/", (), n, 2) for n in range(3)]
+    for key in keys:
+        cache.get_or_run(key, lambda: dict(report))
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, size * 2, 1)
+    too_big = {"pages": ["x" * (size * 3)]}
+    cache.get_or_run(("https://example.com/big", (), 1, 1), lambda: too_big)
+    assert cache.stats()["entries"] == 2  # larger than the whole cache: not stored, nothing evicted
+
+def test_clear():
+    cache = AuditCache()
+    cache.get_or_run(KEY, lambda: {"run": 1})
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+    assert cache.get_or_run(KEY, lambda: {"run": 2}) == {"run": 2}
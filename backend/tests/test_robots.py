@@ -0,0 +1,125 @@
+import pytest
+
+from audit.robots import MAX_CRAWL_DELAY, Robots, parse_robots
+
+BASE = "https://example.com"
+
+def allowed(robots: Robots, path: str) -> bool:
+    return robots.allowed(BASE + path)
+
+def test_empty_robots_allows_everything():
+    robots = parse_robots("")
+    assert robots.found and robots.crawl_delay is None and robots.sitemaps == []
+    assert allowed(robots, "/anything")
+    assert Robots().allowed(BASE + "/anything")
+
+def test_longest_match_wins():
+    robots = parse_robots("""
+User-agent: *
+Disallow: /shop
+Allow: /shop/public
+Disallow: /shop/public/drafts
+""")
+    assert allowed(robots, "/")
+    assert not allowed(robots, "/shop")
+    assert not allowed(robots, "/shop/cart")
+    assert allowed(robots, "/shop/public/item")
+    assert not allowed(robots, "/shop/public/drafts/1")
+
+def test_order_in_file_does_not_matter():
+    a = parse_robots("User-agent: *\nAllow: /p/ok\nDisallow: /p\n")
+    b = parse_robots("User-agent: *\nDisallow: /p\nAllow: /p/ok\n")
+    for path in ("/p", "/p/ok", "/p/ok/x", "/p/no"):
+        assert allowed(a, path) == allowed(b, path)
+    assert allowed(a, "/p/ok") and not allowed(a, "/p/no")
+
+def test_allow_wins_a_tie():
+    robots = parse_robots("User-agent: *\nDisallow: /page\nAllow: /page\n")
+    assert allowed(robots, "/page")
+
+def test_empty_disallow_allows_everything():
+    robots = parse_robots("User-agent: *\nDisallow:\n")
+    assert allowed(robots, "/private")
+
+@pytest.mark.parametrize("path, expected", [
+    ("/search", True),
+    ("/search?q=1", False),
+    ("/a/b/print/c", False),
+    ("/print", True),
+    ("/file.pdf", False),
+    ("/file.pdf?download=1", True),   # $ anchors the end of path + query
+    ("/dir/file.PDF", True),          # case sensitive
+    ("/file.pdfx", True),
+])
+def test_wildcards(path, expected):
+    robots = parse_robots("""
+User-agent: *
+Disallow: /search?
+Disallow: /*/print/
+Disallow: /*.pdf$
+""")
+    assert allowed(robots, path) == expected
+
+def test_wildcard_specificity_counts_pattern_length():
+    robots = parse_robots("User-agent: *\nDisallow: /*.php\nAllow: /index.php$\n")
+    assert allowed(robots, "/index.php")
+    assert not allowed(robots, "/index.php?x=1")
+    assert not allowed(robots, "/admin.php")
+
+def test_non_ascii_paths_compare_escaped():
+    robots = parse_robots("User-agent: *\nDisallow: /café\n")
+    assert not allowed(robots, "/caf%C3%A9/menu")
+    assert not allowed(robots, "/café/menu")
+
+def test_most_specific_agent_group_applies():
+    text = """
+User-agent: *
+Disallow: /
+
+User-agent: SEOQuickAuditBot
+User-agent: otherbot
+Disallow: /private
+Crawl-delay: 2
+
+User-agent: seoquick
+Allow: /private/ok
+"""
+    robots = parse_robots(text)
+    # every group naming a prefix of our product token applies, merged; the * group doesn't
+    assert allowed(robots, "/")
+    assert not allowed(robots, "/private")
+    assert allowed(robots, "/private/ok")
+    assert robots.crawl_delay == 2
+    other = parse_robots(text, agent="somebot")
+    assert not allowed(other, "/")
+
+def test_rules_before_any_user_agent_are_ignored():
+    robots = parse_robots("Disallow: /\nUser-agent: *\nDisallow: /x\n")
+    assert allowed(robots, "/") and not allowed(robots, "/x")
+
+def test_comments_and_sitemaps():
+    robots = parse_robots("""
+# a comment
+Sitemap: https://example.com/sitemap.xml
+User-agent: * # everyone
+Disallow: /tmp # scratch
+Sitemap: /relative.xml
+Sitemap:
+""")
+    assert robots.sitemaps == ["https://example.com/sitemap.xml", "/relative.xml"]
+    assert not allowed(robots, "/tmp/a")
+
+@pytest.mark.parametrize("value, expected", [
+    ("1.5", 1.5),
+    ("10", 10.0),
+    ("30", MAX_CRAWL_DELAY),
+    ("86400", MAX_CRAWL_DELAY),
+    ("inf", MAX_CRAWL_DELAY),
+    ("0", None),
+    ("-5", None),
+    ("nan", None),
+    ("soon", None),
+])
+def test_crawl_delay_is_capped(value, expected):
+    robots = parse_robots(f"User-agent: *\nCrawl-delay: {value}\n")
+    assert robots.crawl_delay == expected
@@ -0,0 +1,73 @@
+import asyncio
+import gzip
+
+import httpx
+
+from audit.sitemaps import iter_sitemap_urls
+from audit.transport import Transport
+
+BASE = "https://example.com"
+
+def urlset(locs: list[str]) -> bytes:
+    entries = "".join(f"<url><loc>{loc}</loc><lastmod>2024-01-01</lastmod></url>" for loc in locs)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>').encode()
+
+def index(locs: list[str]) -> bytes:
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>').encode()
+
+async def chunked(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+def read_all(files: dict[str, bytes], locations: list[str], chunk: int = 64) -> tuple[list[str], list[str]]:
+    """Returns: (page URLs, paths fetched) from the sitemaps at `locations`, served in small chunks."""
+    fetched = []
+    def handler(request: httpx.Request) -> httpx.Response:
+        fetched.append(request.url.path)
+        body = files.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=chunked(body, chunk))
+
+    async def run():
+        async with Transport() as transport:
+            await transport.client.aclose()
+            transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return [url async for url in iter_sitemap_urls(transport, locations)]
+    return asyncio.run(run()), fetched
+
+def test_plain_urlset():
+    pages = [f"{BASE}/p/{i}" for i in range(50)]
+    urls, _ = read_all({"/sitemap.xml": urlset(pages)}, [BASE + "/sitemap.xml"])
+    assert urls == pages
+
+def test_gzip_sitemap_index():
+    a = [f"{BASE}/a/{i}" for i in range(300)]
+    b = [f"{BASE}/b/{i}" for i in range(300)]
+    files = {
+        "/sitemap_index.xml.gz": gzip.compress(index([BASE + "/a.xml.gz", "/b.xml", BASE + "/missing.xml"])),
+        "/a.xml.gz": gzip.compress(urlset(a)),
+        "/b.xml": urlset(b),
+    }
+    # chunks far smaller than an entry, so entries and the gzip stream straddle chunk boundaries
+    urls, fetched = read_all(files, [BASE + "/sitemap_index.xml.gz"], chunk=37)
+    assert urls == a + b
+    assert fetched == ["/sitemap_index.xml.gz", "/a.xml.gz", "/b.xml", "/missing.xml"]
+
+def test_index_loops_are_fetched_once():
+    files = {
+        "/one.xml": index([BASE + "/two.xml", BASE + "/one.xml"]),
+        "/two.xml": index([BASE + "/one.xml", BASE + "/pages.xml"]),
+        "/pages.xml": urlset([BASE + "/p"]),
+    }
+    urls, fetched = read_all(files, [BASE + "/one.xml", BASE + "/one.xml"])
+    assert urls == [BASE + "/p"]
+    assert fetched == ["/one.xml", "/two.xml", "/pages.xml"]
+
+def test_broken_gzip_keeps_what_was_read():
+    body = gzip.compress(urlset([f"{BASE}/p/{i}" for i in range(200)]))
+    urls, _ = read_all({"/s.xml.gz": body[:len(body) // 2]}, [BASE + "/s.xml.gz"])
+    assert urls and urls == [f"{BASE}/p/{i}" for i in range(len(urls))]
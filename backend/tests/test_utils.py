@@ -0,0 +1,44 @@
+import pytest
+
+from audit.utils import canonicalize_url, normalize_url
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://Example.COM/About", "http://example.com/About"),      # path case is kept
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("https://example.com:80/a", "https://example.com:80/a"),      # not the scheme's default
+    ("http://example.com:8080", "http://example.com:8080/"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com./a", "https://example.com/a"),
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/a?b=2&a=1&c=3", "https://example.com/a?a=1&b=2&c=3"),
+    ("https://example.com/a?b=2&&a=1&", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?", "https://example.com/a"),
+    ("https://example.com/%7euser/a%2fb", "https://example.com/~user/a%2Fb"),
+    ("https://example.com/a/", "https://example.com/a/"),          # trailing slash: see dedup_key
+    ("https://user:pw@Example.com:443/", "https://user:pw@example.com/"),
+    ("http://[::1]:80/x", "http://[::1]/x"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+def test_canonicalize_is_idempotent():
+    url = canonicalize_url("HTTPS://Example.com:443/%7Ea/?z=1&y=%2f#top")
+    assert canonicalize_url(url) == url
+
+def test_canonicalize_keeps_malformed_port():
+    assert canonicalize_url("http://example.com:99999/a") == "http://example.com:99999/a"
+
+@pytest.mark.parametrize("href, expected", [
+    ("/b?y=1&x=2#frag", "https://example.com/b?x=2&y=1"),
+    ("c", "https://example.com/a/c"),
+    ("//Other.com:443", "https://other.com/"),
+    ("#only-a-fragment", "https://example.com/a/"),
+    ("mailto:me@example.com", None),
+    ("tel:123", None),
+    ("javascript:void(0)", None),
+    ("", None),
+])
+def test_normalize_url(href, expected):
+    assert normalize_url("https://example.com/a/", href) == expected